@@ -26,7 +26,9 @@ if [ ! -f "rental_management.db" ]; then
 fi
 
 echo "🚀 Starting Backend on http://localhost:5000..."
-python3 app.py &
+python3 -m flask --app app upgrade-db
+# gevent workers hold the idle live-event streams; see gunicorn.conf.py
+gunicorn -c gunicorn.conf.py app:app &
 BACKEND_PID=$!
 
 cd ../frontend
@@ -1,16 +1,51 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
+from werkzeug.exceptions import HTTPException
+from datetime import date, datetime, timedelta, timezone
 from functools import wraps
+from collections import OrderedDict, deque, namedtuple
+from operator import attrgetter
 import jwt
 import os
 import uuid
+import hashlib
+import threading
+import json
+import base64
+import random
+import smtplib
+import time
+import hmac
+import zlib
+import socket
+import select
+import click
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import razorpay
+import requests
+from requests.adapters import HTTPAdapter
+from razorpay.errors import BadRequestError, GatewayError, ServerError
 from flask_mail import Mail, Message
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import redis
+except ImportError:
+    redis = None
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 database_url = os.environ.get('DATABASE_URL', 'sqlite:///rental_management.db')
@@ -20,23 +55,90 @@ app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+app.config['MAX_PAGE_SIZE'] = int(os.environ.get('MAX_PAGE_SIZE', 500))
+app.config['DASHBOARD_CACHE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_TTL', 30))  # seconds
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # off when a proxy in front already compresses
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as they are
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip 1-9
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))  # brotli 0-11
+app.config['COMPRESS_CACHE_SIZE'] = int(os.environ.get('COMPRESS_CACHE_SIZE', 256))  # compressed bodies kept per process, keyed by ETag
+app.config['QUERY_CACHE_ENABLED'] = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+app.config['QUERY_CACHE_URL'] = os.environ.get('QUERY_CACHE_URL')  # redis://... shares the cache between workers; unset keeps an in-process LRU
+app.config['QUERY_CACHE_TTL'] = float(os.environ.get('QUERY_CACHE_TTL', 60))  # seconds an entry is kept; writes invalidate it sooner through the key
+app.config['QUERY_CACHE_SIZE'] = int(os.environ.get('QUERY_CACHE_SIZE', 512))  # entries, local backend
+app.config['QUERY_CACHE_MAX_ENTRY_SIZE'] = int(os.environ.get('QUERY_CACHE_MAX_ENTRY_SIZE', 1024 * 1024))  # bytes; larger bodies are not cached
+app.config['QUERY_CACHE_TIMEOUT'] = float(os.environ.get('QUERY_CACHE_TIMEOUT', 0.5))  # seconds per Redis call
+app.config['STREAM_YIELD_PER'] = int(os.environ.get('STREAM_YIELD_PER', 500))  # rows fetched per round trip when streaming a listing
+
+# Auth Config
+app.config['AUTH_CACHE_TTL'] = int(os.environ.get('AUTH_CACHE_TTL', 60))  # seconds, 0 disables the cache
+app.config['AUTH_CACHE_SIZE'] = int(os.environ.get('AUTH_CACHE_SIZE', 4096))
+app.config['AUTH_TRUST_CLAIMS'] = os.environ.get('AUTH_TRUST_CLAIMS', 'false').lower() in ('1', 'true', 'yes')
+app.config['AUTH_REVOCATION_TTL'] = float(os.environ.get('AUTH_REVOCATION_TTL', 5))  # seconds other processes may keep accepting a revoked token
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')  # werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
 
 # Mail Config
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'your-email@gmail.com')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'your-app-password')
 app.config['MAIL_DEFAULT_SENDER'] = ('RentEase', app.config['MAIL_USERNAME'])
+app.config['EMAIL_WORKER_THREAD'] = os.environ.get('EMAIL_WORKER_THREAD', 'true').lower() in ('1', 'true', 'yes')  # run the outbox worker inside each web process
+app.config['EMAIL_BATCH_SIZE'] = int(os.environ.get('EMAIL_BATCH_SIZE', 50))
+app.config['EMAIL_MAX_ATTEMPTS'] = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 8))
+app.config['EMAIL_POLL_INTERVAL'] = float(os.environ.get('EMAIL_POLL_INTERVAL', 5))  # seconds
+app.config['EMAIL_SMTP_IDLE_TIMEOUT'] = float(os.environ.get('EMAIL_SMTP_IDLE_TIMEOUT', 60))  # seconds before an idle SMTP connection is closed
 
 # Razorpay Config
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', 'rzp_test_placeholder')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', 'secret_placeholder')
+app.config['RAZORPAY_BASE_URL'] = os.environ.get('RAZORPAY_BASE_URL', 'https://api.razorpay.com')
+app.config['RAZORPAY_CONNECT_TIMEOUT'] = float(os.environ.get('RAZORPAY_CONNECT_TIMEOUT', 3))  # seconds
+app.config['RAZORPAY_READ_TIMEOUT'] = float(os.environ.get('RAZORPAY_READ_TIMEOUT', 10))  # seconds
+app.config['RAZORPAY_MAX_RETRIES'] = int(os.environ.get('RAZORPAY_MAX_RETRIES', 2))  # extra attempts for idempotent calls
+app.config['RAZORPAY_POOL_SIZE'] = int(os.environ.get('RAZORPAY_POOL_SIZE', 10))
+app.config['RAZORPAY_BREAKER_THRESHOLD'] = int(os.environ.get('RAZORPAY_BREAKER_THRESHOLD', 5))  # consecutive failures that open the breaker
+app.config['RAZORPAY_BREAKER_RESET'] = float(os.environ.get('RAZORPAY_BREAKER_RESET', 30))  # seconds before a trial call is allowed
+app.config['RAZORPAY_WEBHOOK_SECRET'] = os.environ.get('RAZORPAY_WEBHOOK_SECRET')
+app.config['WEBHOOK_WORKER_THREAD'] = os.environ.get('WEBHOOK_WORKER_THREAD', 'true').lower() in ('1', 'true', 'yes')
+app.config['WEBHOOK_BATCH_SIZE'] = int(os.environ.get('WEBHOOK_BATCH_SIZE', 100))
+app.config['WEBHOOK_POLL_INTERVAL'] = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 2))  # seconds
+app.config['RECONCILE_PAGE_SIZE'] = int(os.environ.get('RECONCILE_PAGE_SIZE', 100))  # Razorpay caps list pages at 100
+app.config['OVERDUE_SWEEP_BATCH_SIZE'] = int(os.environ.get('OVERDUE_SWEEP_BATCH_SIZE', 1000))
 
-try:
-    razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-except:
-    razorpay_client = None
+# Scheduler Config
+app.config['SCHEDULER_THREAD'] = os.environ.get('SCHEDULER_THREAD', 'true').lower() in ('1', 'true', 'yes')  # run the scheduler inside each web process
+app.config['SCHEDULER_TICK'] = float(os.environ.get('SCHEDULER_TICK', 30))  # seconds between checks for due jobs
+app.config['SCHEDULER_LEASE_TTL'] = float(os.environ.get('SCHEDULER_LEASE_TTL', 600))  # seconds a job lease is held before another process may take over
+app.config['SCHEDULER_RETRY_DELAY'] = float(os.environ.get('SCHEDULER_RETRY_DELAY', 300))  # seconds before a failed run is retried
+app.config['SCHEDULER_CATCH_UP_DAYS'] = int(os.environ.get('SCHEDULER_CATCH_UP_DAYS', 92))  # how far back missed runs are replayed
+app.config['RENT_REMINDER_DAYS'] = int(os.environ.get('RENT_REMINDER_DAYS', 3))  # days before the due date
+
+# Job Queue Config
+app.config['JOB_WORKER_THREAD'] = os.environ.get('JOB_WORKER_THREAD', 'true').lower() in ('1', 'true', 'yes')  # run one job worker inside each web process
+app.config['JOB_WORKER_CONCURRENCY'] = int(os.environ.get('JOB_WORKER_CONCURRENCY', 2))  # threads for `flask worker`
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # seconds
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+app.config['JOB_LEASE'] = float(os.environ.get('JOB_LEASE', 1800))  # seconds a running job may go without reporting progress before it is requeued
+
+# Delta Sync Config
+app.config['SYNC_TOMBSTONE_RETENTION_DAYS'] = float(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))  # ?since= cursors older than this must resync from 0
+
+# Live Events Config
+app.config['LIVE_EVENT_POLL_INTERVAL'] = float(os.environ.get('LIVE_EVENT_POLL_INTERVAL', 2))  # seconds; how soon other processes' events reach SQLite deployments
+app.config['LIVE_EVENT_BATCH_SIZE'] = int(os.environ.get('LIVE_EVENT_BATCH_SIZE', 500))
+app.config['LIVE_EVENT_HEARTBEAT'] = float(os.environ.get('LIVE_EVENT_HEARTBEAT', 20))  # seconds between keep-alive comments on idle streams
+app.config['LIVE_EVENT_QUEUE_SIZE'] = int(os.environ.get('LIVE_EVENT_QUEUE_SIZE', 200))  # events buffered per client before a slow one is disconnected
+app.config['LIVE_EVENT_MAX_STREAMS'] = int(os.environ.get('LIVE_EVENT_MAX_STREAMS', 1000))  # open streams per process; keep below gunicorn's worker_connections
+app.config['LIVE_EVENT_RETENTION_HOURS'] = float(os.environ.get('LIVE_EVENT_RETENTION_HOURS', 24))  # replay window for reconnects
+app.config['LIVE_EVENT_TICKET_TTL'] = int(os.environ.get('LIVE_EVENT_TICKET_TTL', 60))  # seconds
+
+# Batch Config
+app.config['BATCH_MAX_REQUESTS'] = int(os.environ.get('BATCH_MAX_REQUESTS', 10))  # sub-requests per /api/batch call
 
 mail = Mail(app)
 
@@ -60,6 +162,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # 'admin' or 'tenant'
+    token_version = db.Column(db.String(32), default=lambda: uuid.uuid4().hex)  # signed into tokens; replaced to revoke them
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     tenant = db.relationship('Tenant', backref='user', uselist=False, cascade='all, delete-orphan')
 
@@ -70,7 +173,12 @@ class Building(db.Model):
     total_floors = db.Column(db.Integer)
     building_type = db.Column(db.String(50))  # 'commercial', 'residential', 'mixed'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
     rooms = db.relationship('Room', backref='building', cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_building_change_seq', 'change_seq'),
+    )
 
 class Room(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -82,10 +190,23 @@ class Room(db.Model):
     rent_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='vacant')  # 'vacant', 'occupied'
     category = db.Column(db.String(20))  # 'residential', 'commercial'
-    photos = db.Column(db.Text)  # JSON string of photo paths
-    description = db.Column(db.Text)
+    photos = db.deferred(db.Column(db.Text))  # JSON string of photo paths
+    description = db.deferred(db.Column(db.Text))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
     tenant = db.relationship('Tenant', backref='room', uselist=False, cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_room_building_status', 'building_id', 'status'),
+        db.Index('ix_room_change_seq', 'change_seq'),
+        # The Rooms page filters by building and the Tenants page by status, both in the default id order
+        db.Index('ix_room_building_id_id', 'building_id', 'id'),
+        db.Index('ix_room_status_id', 'status', 'id'),
+        # (column, id) indexes serve each ROOM_SORT_KEYS ordering and its keyset cursor
+        db.Index('ix_room_room_number_id', 'room_number', 'id'),
+        db.Index('ix_room_rent_amount_id', 'rent_amount', 'id'),
+        db.Index('ix_room_floor_number_id', 'floor_number', 'id'),
+    )
 
 class Tenant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -97,15 +218,24 @@ class Tenant(db.Model):
     id_proof_type = db.Column(db.String(50))
     id_proof_number = db.Column(db.String(100))
     photo_path = db.Column(db.String(255))
-    documents = db.Column(db.Text)  # JSON string of document paths
+    documents = db.deferred(db.Column(db.Text))  # JSON string of document paths
     lease_start_date = db.Column(db.Date)
     lease_end_date = db.Column(db.Date)
     deposit_amount = db.Column(db.Float)
     emergency_contact_name = db.Column(db.String(200))
     emergency_contact_phone = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
     bills = db.relationship('Bill', backref='tenant', cascade='all, delete-orphan')
     complaints = db.relationship('Complaint', backref='tenant', cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_tenant_room_id', 'room_id'),
+        db.Index('ix_tenant_change_seq', 'change_seq'),
+        db.Index('ix_tenant_full_name_id', 'full_name', 'id'),
+        db.Index('ix_tenant_lease_end_date_id', 'lease_end_date', 'id'),
+        db.Index('ix_tenant_created_at_id', 'created_at', 'id'),
+    )
 
 class Bill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -117,7 +247,25 @@ class Bill(db.Model):
     paid_date = db.Column(db.Date)
     status = db.Column(db.String(20), default='pending')  # 'pending', 'paid', 'overdue'
     payment_screenshot = db.Column(db.String(255))  # Path to payment screenshot
+    razorpay_payment_id = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
+    payment_orders = db.relationship('PaymentOrder', backref='bill', cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_bill_tenant_id', 'tenant_id'),
+        # One rent bill per tenant and month; manual bills of other types may repeat
+        db.Index('uq_bill_rent_tenant_month', 'tenant_id', 'billing_month', unique=True,
+                 sqlite_where=db.text("bill_type = 'rent'"), postgresql_where=db.text("bill_type = 'rent'")),
+        db.Index('ix_bill_status_due_date', 'status', 'due_date'),
+        db.Index('ix_bill_month_type', 'billing_month', 'bill_type'),
+        db.Index('ix_bill_due_date_id', 'due_date', 'id'),
+        db.Index('ix_bill_billing_month_id', 'billing_month', 'id'),
+        db.Index('ix_bill_amount_id', 'amount', 'id'),
+        db.Index('ix_bill_created_at_id', 'created_at', 'id'),
+        db.Index('ix_bill_razorpay_payment_id', 'razorpay_payment_id'),
+        db.Index('ix_bill_change_seq', 'change_seq'),
+    )
 
 class PaymentSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -129,12 +277,20 @@ class Complaint(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
     subject = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=False)
+    description = db.deferred(db.Column(db.Text, nullable=False))
     category = db.Column(db.String(50))  # 'maintenance', 'plumbing', 'electrical', 'other'
     status = db.Column(db.String(20), default='open')  # 'open', 'in_progress', 'resolved', 'closed'
-    admin_reply = db.Column(db.Text)
+    admin_reply = db.deferred(db.Column(db.Text))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
+    __table_args__ = (
+        db.Index('ix_complaint_status', 'status'),
+        db.Index('ix_complaint_tenant_created', 'tenant_id', 'created_at'),
+        db.Index('ix_complaint_created_at_id', 'created_at', 'id'),
+        db.Index('ix_complaint_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_complaint_change_seq', 'change_seq'),
+    )
 
 class EmergencyContact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -144,6 +300,7 @@ class EmergencyContact(db.Model):
     alternate_phone = db.Column(db.String(20))
     available_24x7 = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -151,11 +308,299 @@ class Announcement(db.Model):
     message = db.Column(db.Text, nullable=False)
     priority = db.Column(db.String(20), default='normal')  # 'low', 'normal', 'high', 'urgent'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer)  # sync sequence of the last committed write, NULL until that commit
+    __table_args__ = (
+        db.Index('ix_announcement_change_seq', 'change_seq'),
+    )
+
+class PaymentOrder(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    bill_id = db.Column(db.Integer, db.ForeignKey('bill.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)  # in paise
+    currency = db.Column(db.String(3), nullable=False, default='INR')
+    gateway_order_id = db.Column(db.String(64), unique=True)
+    status = db.Column(db.String(20), default='creating')  # 'creating', 'created', 'failed', 'paid'
+    is_mock = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        # One gateway order per bill and amount: retries and double-clicks reuse it
+        db.Index('uq_payment_order_bill_amount', 'bill_id', 'amount', 'currency', unique=True),
+    )
+
+class WebhookEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(64), unique=True, nullable=False)
+    event_type = db.Column(db.String(50))
+    payload = db.Column(db.Text, nullable=False)  # raw request body, exactly as signed
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'processing', 'processed', 'ignored', 'failed'
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('ix_webhook_event_status', 'status'),
+    )
+
+class ReconciliationRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    range_from = db.Column(db.Date, nullable=False)
+    range_to = db.Column(db.Date, nullable=False)
+    payments_scanned = db.Column(db.Integer, default=0)
+    discrepancies = db.Column(db.Integer, default=0)
+    fixes_applied = db.Column(db.Integer, default=0)
+    report = db.Column(db.Text)  # JSON list of discrepancies
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class OutboxEmail(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'sending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('ix_outbox_email_status_next', 'status', 'next_attempt_at'),
+    )
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text)  # JSON arguments for the handler
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    progress_done = db.Column(db.Integer, default=0)
+    progress_total = db.Column(db.Integer)
+    progress_message = db.Column(db.String(255))
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)  # refreshed on every progress report
+    created_by = db.Column(db.Integer)  # user id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+class ScheduledJob(db.Model):
+    name = db.Column(db.String(64), primary_key=True)
+    last_scheduled_for = db.Column(db.DateTime)  # latest slot that completed, server local time
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_duration_ms = db.Column(db.Integer)
+    last_status = db.Column(db.String(20))  # 'ok', 'failed'
+    last_error = db.Column(db.Text)
+    run_count = db.Column(db.Integer, default=0)
+    lease_owner = db.Column(db.String(128))  # host:pid currently running the job
+    lease_expires_at = db.Column(db.DateTime)
+
+class TableVersion(db.Model):
+    name = db.Column(db.String(64), primary_key=True)  # table name
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped by every commit that writes the table
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LiveEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    change_seq = db.Column(db.Integer, nullable=False)  # sync sequence of the commit that made the change
+    kind = db.Column(db.String(20), nullable=False)  # 'bill', 'complaint', 'announcement'
+    row_id = db.Column(db.Integer, nullable=False)
+    tenant_id = db.Column(db.Integer)  # who may see it besides admins; NULL for everyone
+    status = db.Column(db.String(20))  # the row's status after the change, 'deleted' for deletions
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_live_event_seq', 'change_seq', 'id'),
+        db.Index('ix_live_event_created_at', 'created_at'),
+    )
+
+class SyncTombstone(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    tenant_id = db.Column(db.Integer)  # tenant the deleted row belonged to, NULL for shared rows
+    change_seq = db.Column(db.Integer)  # sync sequence of the deleting commit
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_sync_tombstone_table_seq', 'table_name', 'change_seq'),
+        db.Index('ix_sync_tombstone_change_seq', 'change_seq'),  # commits stamp WHERE change_seq IS NULL
+    )
+
+# ==================== AUTH IDENTITY ====================
+
+class Identity:
+    """The authenticated caller, detached from any DB session so it can be cached across requests."""
+    def __init__(self, id, role, tenant_id=None, username=None, email=None):
+        self.id = id
+        self.role = role
+        self.tenant_id = tenant_id
+        self._username = username
+        self._email = email
+
+    @property
+    def username(self):
+        if self._username is None:
+            self._load_profile()
+        return self._username
+
+    @property
+    def email(self):
+        if self._email is None:
+            self._load_profile()
+        return self._email
+
+    @property
+    def tenant(self):
+        if self.tenant_id is None:
+            return None
+        return db.session.get(Tenant, self.tenant_id)
+
+    def _load_profile(self):
+        # Only reached when the identity was built from trusted claims
+        user = db.session.get(User, self.id)
+        if user:
+            self._username, self._email = user.username, user.email
+
+class IdentityCache:
+    """Bounded LRU of resolved identities keyed by (user_id, token hash), each entry living at most `ttl` seconds.
+
+    Also caches each user's token_version for `version_ttl` seconds. The database column is what every process
+    shares, so a revocation anywhere reaches all of them within that time.
+    """
+    def __init__(self, maxsize, ttl, version_ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()  # user_id -> (token_version or None once deleted, expires)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            identity, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return identity
+
+    def put(self, key, identity):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (identity, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def token_version(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is not None and entry[1] >= now:
+                return entry[0]
+        version = db.session.scalar(db.select(User.token_version).where(User.id == user_id))
+        if self.version_ttl > 0:
+            with self._lock:
+                self._versions[user_id] = (version, now + self.version_ttl)
+                self._versions.move_to_end(user_id)
+                while len(self._versions) > self.maxsize:
+                    self._versions.popitem(last=False)
+        return version
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+            self._versions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+identity_cache = IdentityCache(app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL'], app.config['AUTH_REVOCATION_TTL'])
+
+def issue_token(user):
+    tenant = user.tenant
+    return jwt.encode({
+        'user_id': user.id,
+        'role': user.role,
+        'tenant_id': tenant.id if tenant else None,
+        'tv': user.token_version,
+        'iat': datetime.utcnow(),
+        'exp': datetime.utcnow() + timedelta(days=7)
+    }, app.config['SECRET_KEY'])
+
+def resolve_identity(token, data):
+    user_id = data['user_id']
+    # Deleted users, reused ids and revoked tokens all fail here: a new row never gets an old token_version
+    version = identity_cache.token_version(user_id)
+    if version is None or data.get('tv') != version:
+        return None
+    key = (user_id, hashlib.sha256(token.encode()).hexdigest())
+    identity = identity_cache.get(key)
+    if identity is not None:
+        return identity
+    if app.config['AUTH_TRUST_CLAIMS'] and 'role' in data and 'tenant_id' in data:
+        # Signed claims are authoritative; username/email are fetched only if a handler asks for them
+        identity = Identity(user_id, data['role'], data['tenant_id'])
+    else:
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        tenant = user.tenant
+        identity = Identity(user.id, user.role, tenant.id if tenant else None, user.username, user.email)
+    identity_cache.put(key, identity)
+    return identity
+
+def revoke_tokens(connection, user_id):
+    """Invalidate every token issued to the user, in the transaction that made them wrong."""
+    connection.execute(db.update(User.__table__).where(User.id == user_id).values(token_version=uuid.uuid4().hex))
+    identity_cache.invalidate_user(user_id)
+
+@db.event.listens_for(User, 'after_delete')
+def _evict_deleted_user(mapper, connection, target):
+    identity_cache.invalidate_user(target.id)
+
+@db.event.listens_for(Tenant, 'after_delete')
+def _revoke_deleted_tenant(mapper, connection, target):
+    # The user's tokens carry this tenant_id
+    if target.user_id:
+        revoke_tokens(connection, target.user_id)
+
+@db.event.listens_for(User, 'before_update')
+def _revoke_role_change(mapper, connection, target):
+    # Signed claims carry the role, so tokens issued before the change must stop working
+    if db.inspect(target).attrs.role.history.has_changes():
+        target.token_version = uuid.uuid4().hex
+        identity_cache.invalidate_user(target.id)
+
+# Set by /api/batch on its sub-requests, which arrive already authenticated
+BATCH_IDENTITY_ENVIRON = 'rentease.identity'
 
 # JWT Token decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        current_user = request.environ.get(BATCH_IDENTITY_ENVIRON)
+        if current_user is not None:
+            return f(current_user, *args, **kwargs)
         token = request.headers.get('Authorization')
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
@@ -163,9 +608,13 @@ def token_required(f):
             if token.startswith('Bearer '):
                 token = token[7:]
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            if 'purpose' in data:
+                raise jwt.InvalidTokenError('Single-purpose ticket')
+            current_user = resolve_identity(token, data)
         except:
             return jsonify({'message': 'Token is invalid'}), 401
+        if current_user is None:
+            return jsonify({'message': 'Token is invalid'}), 401
         return f(current_user, *args, **kwargs)
     return decorated
 
@@ -177,6 +626,1310 @@ def admin_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+# ==================== SCHEMA MIGRATIONS ====================
+
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# (version, name, fn(connection)) in the order they must be applied
+MIGRATIONS = []
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+def create_missing_indexes(conn, *models):
+    for model in models:
+        existing = {column['name'] for column in db.inspect(conn).get_columns(model.__tablename__)}
+        for index in model.__table__.indexes:
+            # Indexes on columns a later migration adds are created by that migration
+            if all(column.name in existing for column in index.columns):
+                index.create(conn, checkfirst=True)
+
+def add_missing_columns(conn, model, *names):
+    existing = {column['name'] for column in db.inspect(conn).get_columns(model.__tablename__)}
+    for name in names:
+        if name not in existing:
+            column = model.__table__.c[name]
+            conn.exec_driver_sql(f'ALTER TABLE {model.__tablename__} ADD COLUMN {name} {column.type.compile(conn.dialect)}')
+
+def check_duplicate_rent_bills(conn):
+    duplicate = conn.execute(
+        db.select(Bill.tenant_id, Bill.billing_month)
+        .where(Bill.bill_type == 'rent')
+        .group_by(Bill.tenant_id, Bill.billing_month)
+        .having(db.func.count() > 1)
+        .limit(1)
+    ).first()
+    if duplicate:
+        raise RuntimeError(f'Duplicate rent bills for tenant {duplicate[0]} ({duplicate[1]}) must be removed before upgrading')
+
+@migration(1, 'Hot-path indexes and unique rent bill per tenant and month')
+def _migration_hot_path_indexes(conn):
+    check_duplicate_rent_bills(conn)
+    create_missing_indexes(conn, Bill, Complaint, Room, Tenant)
+
+@migration(2, 'Razorpay payment id on bills')
+def _migration_bill_payment_id(conn):
+    add_missing_columns(conn, Bill, 'razorpay_payment_id')
+    create_missing_indexes(conn, Bill)
+
+@migration(3, 'updated_at on buildings, rooms, tenants, bills, emergency contacts and announcements')
+def _migration_updated_at(conn):
+    for model in (Building, Room, Tenant, Bill, EmergencyContact, Announcement):
+        add_missing_columns(conn, model, 'updated_at')
+        conn.execute(db.update(model.__table__).where(model.updated_at.is_(None)).values(updated_at=model.created_at))
+
+@migration(4, 'Change sequence on buildings, rooms, tenants, bills, complaints and announcements for delta sync')
+def _migration_change_seq(conn):
+    for model in (Building, Room, Tenant, Bill, Complaint, Announcement):
+        add_missing_columns(conn, model, 'change_seq')
+        create_missing_indexes(conn, model)
+        # Existing rows count as written by change 1, so a first ?since=0 returns them
+        conn.execute(
+            db.update(model.__table__).where(model.change_seq.is_(None))
+            .values(change_seq=1, updated_at=model.__table__.c.updated_at)
+        )
+    conn.execute(insert_ignoring_duplicates(TableVersion), {'name': SYNC_SEQUENCE, 'version': 1, 'updated_at': datetime.utcnow()})
+
+@migration(5, 'Token version on users, for revocation shared by every process')
+def _migration_token_version(conn):
+    add_missing_columns(conn, User, 'token_version')
+    # Tokens issued before this have no version and stop working: users sign in again once
+    for (user_id,) in conn.execute(db.select(User.id).where(User.token_version.is_(None))).all():
+        conn.execute(db.update(User.__table__).where(User.id == user_id).values(token_version=uuid.uuid4().hex))
+
+@migration(6, 'Unique bill per tenant and month for rent only')
+def _migration_rent_only_unique(conn):
+    # Migration 1 made every bill type unique per tenant and month, rejecting legitimate repeat manual bills
+    conn.exec_driver_sql('DROP INDEX IF EXISTS uq_bill_tenant_type_month')
+    check_duplicate_rent_bills(conn)
+    create_missing_indexes(conn, Bill)
+
+@migration(7, '(column, id) indexes for every list sort key')
+def _migration_sort_key_indexes(conn):
+    # Superseded by ix_bill_due_date_id and ix_complaint_created_at_id
+    conn.exec_driver_sql('DROP INDEX IF EXISTS ix_bill_due_date')
+    conn.exec_driver_sql('DROP INDEX IF EXISTS ix_complaint_created_at')
+    create_missing_indexes(conn, Room, Tenant, Bill, Complaint)
+
+@migration(8, 'Tenant scope and deletion time on sync tombstones')
+def _migration_tombstone_scope(conn):
+    add_missing_columns(conn, SyncTombstone, 'tenant_id', 'deleted_at')
+    create_missing_indexes(conn, SyncTombstone)
+    # Existing tombstones cannot be scoped to a tenant, so they are dropped and older cursors resync
+    seq = conn.execute(db.select(TableVersion.version).where(TableVersion.name == SYNC_SEQUENCE)).scalar()
+    if seq:
+        advance_sync_horizon(conn, seq)
+
+@migration(9, 'Room indexes for the building and status filtered listings')
+def _migration_room_filter_indexes(conn):
+    create_missing_indexes(conn, Room)
+
+def upgrade_schema():
+    """Create missing tables, then apply every migration that has not been recorded yet."""
+    db.create_all()
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+    for version, name, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            fn(conn)
+            conn.execute(db.insert(SchemaMigration).values(version=version, name=name, applied_at=datetime.utcnow()))
+        print(f"Applied migration {version}: {name}")
+    seed_table_versions()
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Bring the database schema up to date."""
+    upgrade_schema()
+
+def index_check_queries():
+    """The dashboard, background job and per-commit statements, built by the code that runs them."""
+    today = datetime.now().date()
+    queries = {
+        'dashboard stats': dashboard_stats_query(today.strftime('%Y-%m')),
+        'overdue sweep batch': overdue_sweeper.batch_query(today),
+        'rent reminders': rent_reminder_query(today)
+    }
+    for model in SYNCED_MODELS + (SyncTombstone,):
+        queries[f'{model.__tablename__} change_seq stamp'] = change_seq_stamp(model, 1)
+    return queries
+
+def list_check_queries():
+    """(name, statement, check_scan, check_sort) for the statements the list endpoints run, built by their own helpers.
+
+    An unfiltered admin page may walk the table in index order but must not sort it; a filtered or tenant-scoped page
+    and a sync must seek an index, and their default sort must come from it too.
+    """
+    # Each endpoint's query builder, sort keys, default sort and sync changes, whether a tenant sees only their own
+    # rows, and the filters its pages send
+    endpoints = (
+        ('/api/rooms', room_list_query, ROOM_SORT_KEYS, Room.id, 'id', room_changes, False, [{'building_id': 1}, {'status': 'vacant'}]),
+        ('/api/tenants', tenant_list_query, TENANT_SORT_KEYS, Tenant.id, 'id', tenant_changes, True, []),
+        ('/api/bills', bill_list_query, BILL_SORT_KEYS, Bill.id, 'id', bill_changes, True, []),
+        ('/api/complaints', complaint_list_query, COMPLAINT_SORT_KEYS, Complaint.id, '-created_at', complaint_changes, True, [])
+    )
+    admin, tenant = Identity(0, 'admin'), Identity(0, 'tenant', tenant_id=1)
+    sample = {int: 1, float: 1.0, str: 'a', date: datetime.now().date(), datetime: datetime.now()}
+    for path, builder, sort_keys, id_column, default_sort, changes, tenant_scoped, filters in endpoints:
+        callers = [(admin, {})] + [(admin, f) for f in filters] + ([(tenant, {})] if tenant_scoped else [])
+        for user, args in callers:
+            scoped = bool(args) or user.role != 'admin'
+            who = f"{path}?{'&'.join(f'{k}={v}' for k, v in args.items())}" + (' as tenant' if user.role != 'admin' else '')
+            with app.test_request_context(path, query_string=dict(args, since=1)):
+                tombstones, rows = sync_queries(builder(user), id_column, changes, 1, sync_tenant_scope(user))
+                yield f'{who} since', rows.statement, True, False
+                yield f'{who} since deletions', tombstones, True, False
+            for name, key in sort_keys.items():
+                cursors = [[sample[key.expr.type.python_type], 1]] + ([[None, 1]] if key.nullable else [])
+                for sort in (name, '-' + name):
+                    for cursor in [None] + cursors:
+                        page = dict(args, sort=sort, limit=app.config['MAX_PAGE_SIZE'])
+                        if cursor:
+                            page['cursor'] = encode_cursor(sort, cursor)
+                        with app.test_request_context(path, query_string=page):
+                            _, _, queries = page_queries(builder(user), sort_keys, id_column, default_sort)
+                            for i, ranged in enumerate(queries):
+                                label = f"{who} sort={sort}" + (f' after {cursor[0]!r} range {i}' if cursor else '')
+                                yield label, ranged.limit(page_limit() + 1).statement, scoped, not scoped or sort == default_sort
+
+def explain_plan(conn, stmt):
+    # IN lists from the endpoints' filters are expanding parameters; render them to plain placeholders
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+    return [row[0] for row in rows]
+
+def uses_full_scan(dialect, plan):
+    if dialect == 'sqlite':
+        # 'SCAN bill' is a table scan; 'SCAN bill USING INDEX ...' walks an index
+        return any(line.startswith('SCAN ') and ' USING ' not in line and line != 'SCAN CONSTANT ROW' for line in plan)
+    return any('Seq Scan' in line for line in plan)
+
+def uses_sort(dialect, plan):
+    # An ORDER BY the index cannot serve sorts the whole result before LIMIT applies
+    if dialect == 'sqlite':
+        return any('USE TEMP B-TREE' in line for line in plan)
+    return any(line.strip().lstrip('-> ').startswith(('Sort', 'Incremental Sort')) for line in plan)
+
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """EXPLAIN every hot query and list sort; fail on a full table scan or an ORDER BY no index serves."""
+    failures = 0
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            # Tiny tables make the planner prefer seq scans; we only want to know an index is usable
+            conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        checks = [(name, stmt, True, True) for name, stmt in index_check_queries().items()]
+        checks += list_check_queries()
+        for name, stmt, check_scan, check_sort in checks:
+            plan = explain_plan(conn, stmt)
+            scan = check_scan and uses_full_scan(conn.dialect.name, plan)
+            sort = check_sort and uses_sort(conn.dialect.name, plan)
+            failures += scan or sort
+            print(f"{'SCAN' if scan else 'SORT' if sort else 'ok  '} {name}: {' | '.join(plan)}")
+    if failures:
+        raise SystemExit(f'{failures} hot queries are not fully served by an index')
+
+# ==================== METRICS ====================
+
+class LatencyStats:
+    """Running count/total/max of observed durations, in seconds."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0,
+                'max_ms': round(self.max * 1000, 3)
+            }
+
+class LatencyHistogram(LatencyStats):
+    """LatencyStats plus cumulative counts per upper bound, in milliseconds."""
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        super().__init__()
+        self.buckets = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.BUCKETS_MS) if ms <= bound), len(self.BUCKETS_MS))
+        with self._lock:
+            self.buckets[index] += 1
+        super().record(seconds)
+
+    def snapshot(self):
+        data = super().snapshot()
+        with self._lock:
+            counts = list(self.buckets)
+        running = 0
+        data['buckets'] = {}
+        for bound, count in zip([str(b) for b in self.BUCKETS_MS] + ['+Inf'], counts):
+            running += count
+            data['buckets'][bound] = running
+        return data
+
+# name -> zero-argument callable returning a JSON-able dict, reported by /api/metrics
+metrics_registry = {}
+
+# ==================== CHANGE TRACKING ====================
+
+# fn(table_names) callbacks run after every commit that wrote to at least one table
+commit_listeners = []
+
+def _written_tables(session):
+    return session.info.setdefault('written_tables', set())
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tables.add(obj.__table__.name)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_statements(orm_execute_state):
+    # Bulk INSERT ... SELECT / UPDATE / DELETE statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+@db.event.listens_for(db.session, 'after_commit')
+def _notify_commit_listeners(session):
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        for listener in commit_listeners:
+            listener(frozenset(tables))
+
+@db.event.listens_for(db.session, 'after_rollback')
+def _forget_written_tables(session):
+    session.info.pop('written_tables', None)
+
+class SingleFlightCache:
+    """Small TTL cache where concurrent misses for the same key share a single computation."""
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._values = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            waiter = self._inflight.get(key)
+            leader = waiter is None
+            if leader:
+                waiter = self._inflight[key] = {'done': threading.Event(), 'value': None, 'error': None}
+                generation = self._generation
+        if not leader:
+            waiter['done'].wait()
+            if waiter['error'] is not None:
+                raise waiter['error']
+            return waiter['value']
+        try:
+            waiter['value'] = compute()
+            with self._lock:
+                # A clear() while we were computing means the value may already be stale
+                if generation == self._generation:
+                    self._values[key] = (waiter['value'], time.monotonic() + self.ttl)
+            return waiter['value']
+        except Exception as e:
+            waiter['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter['done'].set()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._generation += 1
+
+    def snapshot(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._values)}
+
+# ==================== TABLE VERSIONS ====================
+
+# Tables whose commits bump a TableVersion row, for HTTP validators and query cache keys
+VERSIONED_TABLES = frozenset({'building', 'room', 'tenant', 'bill', 'complaint', 'emergency_contact', 'announcement', 'payment_settings'})
+
+@db.event.listens_for(db.session, 'before_commit')
+def _bump_table_versions(session):
+    # Flush first so the written tables are known, then bump in the same transaction as the write
+    session.flush()
+    tables = _written_tables(session) & VERSIONED_TABLES
+    if tables:
+        session.connection().execute(
+            db.update(TableVersion.__table__)
+            .where(TableVersion.name.in_(tables))
+            .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+        )
+
+def seed_table_versions():
+    db.session.execute(insert_ignoring_duplicates(TableVersion), [
+        {'name': name, 'version': 0, 'updated_at': datetime.utcnow()} for name in VERSIONED_TABLES | {SYNC_SEQUENCE, SYNC_HORIZON}
+    ])
+    db.session.commit()
+
+def table_versions(tables):
+    """A version string and last-modified time for the tables, from one primary key read."""
+    rows = db.session.execute(
+        db.select(TableVersion.name, TableVersion.version, TableVersion.updated_at).where(TableVersion.name.in_(tables))
+    ).all()
+    if len(rows) < len(tables):
+        seed_table_versions()
+        return table_versions(tables)
+    version = ','.join(f'{name}:{number}' for name, number, _ in sorted(rows))
+    last_modified = max(updated_at for _, _, updated_at in rows)
+    return version, last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+def conditional(*tables, per_user=False):
+    """Validate with ETag / Last-Modified derived from the tables' versions, and answer 304 without running the view.
+
+    Goes below @token_required. per_user is for responses that differ between users of the same role.
+    """
+    unknown = set(tables) - VERSIONED_TABLES
+    if unknown:
+        raise ValueError(f'Not versioned: {", ".join(sorted(unknown))}')
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            version, last_modified = table_versions(tables)
+            scope = f'user:{current_user.id}' if per_user else f'role:{current_user.role}'
+            etag = hashlib.sha1(f'{request.full_path}|{scope}|{version}'.encode()).hexdigest()
+            # Last-Modified has one-second resolution: until the second of the last write is over, a later
+            # write could share it, so only the ETag validates and no Last-Modified is sent
+            settled = datetime.now(timezone.utc) - last_modified >= timedelta(seconds=1)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = settled and request.if_modified_since is not None and last_modified <= request.if_modified_since
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if settled:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated
+    return decorator
+
+# ==================== CHANGE SEQUENCE ====================
+
+# TableVersion row whose version numbers every commit that writes a synced table
+SYNC_SEQUENCE = 'sync'
+# TableVersion row holding the sequence up to which tombstones have been pruned
+SYNC_HORIZON = 'sync_horizon'
+# fn(connection, seq, written_tables), run in the committing transaction before its rows are stamped with seq
+sequence_listeners = []
+# Tables with a change_seq column, served by ?since= delta listings
+SYNCED_MODELS = (Building, Room, Tenant, Bill, Complaint, Announcement)
+SYNCED_TABLES = frozenset(model.__tablename__ for model in SYNCED_MODELS)
+
+def _record_tombstone(mapper, connection, target):
+    # Scoped to the owning tenant, so tenant users are never told about other tenants' deletions
+    tenant_id = target.id if isinstance(target, Tenant) else getattr(target, 'tenant_id', None)
+    connection.execute(db.insert(SyncTombstone.__table__).values(table_name=mapper.local_table.name, row_id=target.id, tenant_id=tenant_id))
+
+for _model in SYNCED_MODELS:
+    db.event.listen(_model, 'after_delete', _record_tombstone)
+
+def _reset_change_seq(mapper, connection, target):
+    if db.inspect(target).session.is_modified(target, include_collections=False):
+        target.change_seq = None
+
+for _model in SYNCED_MODELS:
+    db.event.listen(_model, 'before_update', _reset_change_seq)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _reset_change_seq_in_bulk_updates(orm_execute_state):
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if orm_execute_state.is_update and table is not None and table.name in SYNCED_TABLES:
+        orm_execute_state.statement = orm_execute_state.statement.values(change_seq=None)
+
+@db.event.listens_for(Tenant, 'after_delete')
+def _touch_vacated_room(mapper, connection, target):
+    # The room listing shows its tenant's name, so the room counts as changed too
+    if target.room_id:
+        connection.execute(db.update(Room.__table__).where(Room.id == target.room_id).values(change_seq=None, updated_at=Room.updated_at))
+
+@db.event.listens_for(db.session, 'before_commit')
+def _stamp_change_seq(session):
+    # Writes leave change_seq NULL; the commit claims the next sequence number and stamps them with it.
+    # The sequence row stays locked until commit, so numbers become visible in the order they were handed out.
+    session.flush()
+    tables = _written_tables(session) & SYNCED_TABLES
+    if not tables:
+        return
+    conn = session.connection()
+    conn.execute(
+        db.update(TableVersion.__table__)
+        .where(TableVersion.name == SYNC_SEQUENCE)
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    seq = conn.execute(db.select(TableVersion.version).where(TableVersion.name == SYNC_SEQUENCE)).scalar()
+    if seq is None:
+        return
+    for listener in sequence_listeners:
+        listener(conn, seq, tables)
+    # Every synced table, not just the written ones: delete hooks touch related rows outside the session's tracking
+    for model in SYNCED_MODELS + (SyncTombstone,):
+        conn.execute(change_seq_stamp(model, seq))
+
+def change_seq_stamp(model, seq):
+    """The UPDATE that stamps model's rows written in this commit with seq."""
+    values = {'change_seq': seq}
+    if 'updated_at' in model.__table__.c:
+        values['updated_at'] = model.__table__.c.updated_at
+    return db.update(model.__table__).where(model.change_seq.is_(None)).values(**values)
+
+def current_change_seq():
+    return db.session.scalar(db.select(TableVersion.version).where(TableVersion.name == SYNC_SEQUENCE)) or 0
+
+def sync_horizon():
+    return db.session.scalar(db.select(TableVersion.version).where(TableVersion.name == SYNC_HORIZON)) or 0
+
+def advance_sync_horizon(conn, seq):
+    """Forget deletions up to seq: ?since= cursors below it can no longer be served and must resync from 0."""
+    conn.execute(db.delete(SyncTombstone.__table__).where(SyncTombstone.change_seq <= seq))
+    conn.execute(insert_ignoring_duplicates(TableVersion), {'name': SYNC_HORIZON, 'version': 0, 'updated_at': datetime.utcnow()})
+    conn.execute(
+        db.update(TableVersion.__table__)
+        .where(TableVersion.name == SYNC_HORIZON, TableVersion.version < seq)
+        .values(version=seq, updated_at=datetime.utcnow())
+    )
+
+# ==================== QUERY CACHE ====================
+
+class LocalCacheBackend:
+    """In-process LRU. Each process fills its own; keys carry the committed table versions, so none serves stale bodies."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, body)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class RedisCacheBackend:
+    """Shared by every process, so a body computed by one worker serves them all."""
+    PREFIX = 'rentease:qc:'
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(self.PREFIX + key)
+
+    def set(self, key, body, ttl):
+        self.client.set(self.PREFIX + key, body, ex=max(1, int(ttl)))
+
+class QueryCache:
+    """Caches JSON bodies of GET endpoints under keys that embed the TableVersion of every table they read.
+
+    Any process's commit that writes a table bumps its version in the same transaction, so dependent entries
+    are never read again and age out of the backend. Backend errors degrade to uncached responses.
+    """
+    def __init__(self, backend, ttl, max_entry_size):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entry_size = max_entry_size
+        self.stats = {}  # endpoint -> [hits, misses]
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, hit):
+        with self.lock:
+            counts = self.stats.setdefault(endpoint, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def lookup(self, key_parts):
+        """(key, cached body or None); key is None when the backend is unavailable."""
+        key = hashlib.sha1(repr(key_parts).encode()).hexdigest()
+        try:
+            return key, self.backend.get(key)
+        except Exception as e:
+            print(f"Query cache lookup failed: {e}")
+            return None, None
+
+    def store(self, key, body):
+        if len(body) > self.max_entry_size:
+            return
+        try:
+            self.backend.set(key, body, self.ttl)
+        except Exception as e:
+            print(f"Query cache store failed: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            stats = {endpoint: list(counts) for endpoint, counts in self.stats.items()}
+        return {
+            'backend': type(self.backend).__name__,
+            'endpoints': {endpoint: {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None
+            } for endpoint, (hits, misses) in sorted(stats.items())}
+        }
+
+def make_query_cache_backend(url):
+    if not url:
+        return LocalCacheBackend(app.config['QUERY_CACHE_SIZE'])
+    if redis is None:
+        raise RuntimeError('QUERY_CACHE_URL is set but the redis package is not installed')
+    return RedisCacheBackend(redis.Redis.from_url(url, socket_timeout=app.config['QUERY_CACHE_TIMEOUT']))
+
+query_cache = QueryCache(
+    make_query_cache_backend(app.config['QUERY_CACHE_URL']),
+    app.config['QUERY_CACHE_TTL'],
+    app.config['QUERY_CACHE_MAX_ENTRY_SIZE']
+)
+metrics_registry['query_cache'] = query_cache.snapshot
+
+def cached(*tables):
+    """Serve the view's JSON from the query cache until a commit writes one of `tables`. Goes below @token_required.
+
+    Entries are scoped to the endpoint, its arguments and the caller's role, and to the tenant for tenant users.
+    The key carries the tables' committed TableVersion, read once per request, so a write made by any process
+    (another worker, `flask worker`, the scheduler) is seen by the next request.
+    """
+    unknown = set(tables) - VERSIONED_TABLES
+    if unknown:
+        raise ValueError(f'Not versioned: {", ".join(sorted(unknown))}')
+    tables = tuple(sorted(tables))
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if not app.config['QUERY_CACHE_ENABLED'] or is_streaming():
+                return f(current_user, *args, **kwargs)
+            scope = current_user.role if current_user.role == 'admin' else f'tenant:{current_user.tenant_id}'
+            key_parts = (request.endpoint, scope, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            version, _ = table_versions(tables)
+            key, body = query_cache.lookup(key_parts + (version,))
+            query_cache.record(request.endpoint, body is not None)
+            if body is not None:
+                return app.response_class(body, mimetype='application/json')
+            response = make_response(f(current_user, *args, **kwargs))
+            if key and response.status_code == 200 and not response.is_streamed and response.mimetype == 'application/json':
+                query_cache.store(key, response.get_data())
+            return response
+        return decorated
+    return decorator
+
+# ==================== BACKGROUND WORKERS ====================
+
+class BackgroundWorker:
+    """Base for workers that poll the database: run_once() handles one batch and returns how many rows it took.
+
+    Each worker runs either as a daemon thread inside the web process or standalone from its CLI command,
+    and is woken early by commits that write to one of its `wake_tables`.
+    """
+    name = 'worker'
+    wake_tables = frozenset()
+
+    def __init__(self, batch_size, poll_interval, run_in_thread):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.run_in_thread = run_in_thread
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def run_forever(self):
+        while True:
+            with app.app_context():
+                try:
+                    handled = self.run_once()
+                except Exception as e:
+                    db.session.rollback()
+                    handled = 0
+                    print(f"{self.name} worker error: {e}")
+            if handled < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def ensure_thread(self):
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid():
+                self._thread = threading.Thread(target=self.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+                self._thread_pid = os.getpid()
+
+background_workers = []
+
+def claim_rows(model, due, limit, **values):
+    """Atomically mark up to `limit` rows matching `due` as ours and return them.
+
+    On Postgres the candidates are locked with SKIP LOCKED, so concurrent workers pick disjoint rows instead of
+    queueing behind each other; SQLite serializes writers anyway. The predicate is re-checked in the UPDATE,
+    so a row is never claimed twice either way.
+    """
+    ids = db.session.execute(
+        db.select(model.id).where(due).order_by(model.id).limit(limit).with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.session.execute(
+        db.update(model).where(model.id.in_(ids), due).values(claim_token=token, **values)
+    )
+    db.session.commit()
+    return model.query.filter_by(claim_token=token).order_by(model.id).all()
+
+def _wake_background_workers(tables):
+    for worker in background_workers:
+        if tables & worker.wake_tables:
+            worker.wake()
+
+commit_listeners.append(_wake_background_workers)
+
+@app.before_request
+def _start_background_workers():
+    for worker in background_workers:
+        if worker.run_in_thread:
+            worker.ensure_thread()
+
+# ==================== PASSWORD HASHING ====================
+
+class HashingBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs werkzeug's KDFs in a bounded process pool so a login burst cannot pin the request workers."""
+    def __init__(self, method, workers, max_queue, timeout):
+        self.method = method
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.hash_latency = LatencyStats()
+        self.verify_latency = LatencyStats()
+        self.queue_depth = 0
+        self.rejected = 0
+        self._pool = None
+        self._pool_pid = None
+        self._method_prefix = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Created lazily and per process so pre-forked gunicorn workers never share a pool
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _run(self, stats, fn, *args):
+        start = time.perf_counter()
+        if self.workers <= 0:
+            result = fn(*args)
+        else:
+            with self._lock:
+                if self.queue_depth >= self.max_queue:
+                    self.rejected += 1
+                    raise HashingBusy()
+                self.queue_depth += 1
+            try:
+                result = self._executor().submit(fn, *args).result(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self.queue_depth -= 1
+        stats.record(time.perf_counter() - start)
+        return result
+
+    def hash(self, password):
+        return self._run(self.hash_latency, generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(self.verify_latency, check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        if self._method_prefix is None:
+            # werkzeug expands bare method names with its defaults, so read the canonical form off a real hash
+            self._method_prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+    def snapshot(self):
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'rejected': self.rejected,
+            'hash': self.hash_latency.snapshot(),
+            'verify': self.verify_latency.snapshot()
+        }
+
+password_hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_METHOD'],
+    app.config['PASSWORD_HASH_WORKERS'],
+    app.config['PASSWORD_HASH_MAX_QUEUE'],
+    app.config['PASSWORD_HASH_TIMEOUT']
+)
+metrics_registry['password_hashing'] = password_hasher.snapshot
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def verify_password(password_hash, password):
+    return password_hasher.verify(password_hash, password)
+
+@app.errorhandler(HashingBusy)
+def handle_hashing_busy(e):
+    return jsonify({'message': 'Server is busy, please try again shortly'}), 503
+
+# ==================== SERIALIZATION ====================
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Encodes with orjson when it is installed, falling back to the stdlib encoder.
+
+    Output is compact with keys in insertion order, and dates are written as ISO 8601 either way.
+    """
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self.ORJSON_OPTIONS).decode()
+        kwargs.setdefault('separators', (',', ':'))
+        kwargs.setdefault('sort_keys', False)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+app.json = FastJSONProvider(app)
+
+class ResponseSchema:
+    """The fields an endpoint returns: the columns to select, and the keys they are returned under.
+
+    Positional fields are model attributes returned under their own name; keyword fields are any column
+    expression (a joined column, a scalar subquery) returned under the keyword. Selecting `columns` gives
+    plain rows instead of hydrated ORM objects, and dump() reads them back with one attrgetter call.
+    """
+    def __init__(self, *fields, **mapped):
+        self.fields = fields
+        self.mapped = mapped
+        self.columns = list(fields) + [expr.label(name) for name, expr in mapped.items()]
+        self.names = tuple(field.key for field in fields) + tuple(mapped)
+        getter = attrgetter(*self.names)
+        self.values = getter if len(self.names) > 1 else lambda row: (getter(row),)
+
+    def extend(self, *fields, **mapped):
+        return ResponseSchema(*self.fields, *fields, **self.mapped, **mapped)
+
+    def query(self):
+        """A column-only ORM query over this schema, ready for filters and apply_sort_and_page."""
+        return db.session.query(*self.columns)
+
+    def dump(self, row):
+        return dict(zip(self.names, self.values(row)))
+
+    def dump_many(self, rows):
+        """Lazy, so streamed listings never hold every item at once."""
+        return map(self.dump, rows)
+
+def room_tenant_name():
+    # A subquery rather than a join, so a room can never come back twice
+    return db.select(Tenant.full_name).where(Tenant.room_id == Room.id).limit(1).scalar_subquery()
+
+ROOM_SCHEMA = ResponseSchema(
+    Room.id, Room.building_id, Room.room_number, Room.room_type, Room.floor_number, Room.area_sqft,
+    Room.rent_amount, Room.status, Room.category,
+    building_name=Building.name,
+    tenant_name=room_tenant_name()
+)
+ROOM_DETAIL_SCHEMA = ROOM_SCHEMA.extend(Room.photos, Room.description)
+BUILDING_ROOM_SCHEMA = ResponseSchema(
+    Room.id, Room.room_number, Room.room_type, Room.floor_number, Room.area_sqft, Room.rent_amount,
+    Room.status, Room.category,
+    tenant_name=room_tenant_name()
+)
+TENANT_SCHEMA = ResponseSchema(
+    Tenant.id, Tenant.full_name, Tenant.phone, Tenant.email, Tenant.lease_start_date, Tenant.lease_end_date,
+    Tenant.deposit_amount, Tenant.created_at,
+    room_number=Room.room_number,
+    building_name=Building.name,
+    rent_amount=Room.rent_amount
+)
+BILL_SCHEMA = ResponseSchema(
+    Bill.id, Bill.tenant_id, Bill.bill_type, Bill.amount, Bill.billing_month, Bill.due_date, Bill.paid_date,
+    Bill.status, Bill.created_at,
+    tenant_name=Tenant.full_name
+)
+COMPLAINT_SCHEMA = ResponseSchema(
+    Complaint.id, Complaint.subject, Complaint.description, Complaint.category, Complaint.status,
+    Complaint.admin_reply, Complaint.created_at, Complaint.updated_at,
+    tenant_name=Tenant.full_name
+)
+EMERGENCY_CONTACT_SCHEMA = ResponseSchema(
+    EmergencyContact.id, EmergencyContact.service_type, EmergencyContact.contact_name,
+    EmergencyContact.phone_number, EmergencyContact.alternate_phone, EmergencyContact.available_24x7
+)
+ANNOUNCEMENT_SCHEMA = ResponseSchema(
+    Announcement.id, Announcement.title, Announcement.message, Announcement.priority, Announcement.created_at
+)
+
+def best_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+@app.cli.command('bench-json')
+@click.option('--count', default=10000, show_default=True, help='Bills per run.')
+@click.option('--repeat', default=5, show_default=True, help='Runs; the fastest is reported.')
+def bench_json_command(count, repeat):
+    """Time building and encoding a bill listing: ORM objects, hand-built dicts and Flask's stock encoder vs
+    BILL_SCHEMA rows and FastJSONProvider. Database time is left out of both."""
+    tenant = Tenant(id=1, full_name='Bench Tenant')
+    bills = [Bill(
+        id=i, tenant_id=1, tenant=tenant, bill_type='rent', amount=12500.0 + i, billing_month='2026-01',
+        due_date=date(2026, 1, 6), paid_date=date(2026, 1, 3) if i % 2 else None,
+        status='paid' if i % 2 else 'pending', created_at=datetime(2026, 1, 1, 9, 30, i % 60, 123456)
+    ) for i in range(count)]
+    BillRow = namedtuple('BillRow', BILL_SCHEMA.names)
+    rows = [BillRow(*(b.tenant.full_name if name == 'tenant_name' else getattr(b, name) for name in BILL_SCHEMA.names)) for b in bills]
+    stock = DefaultJSONProvider(app)
+    
+    def before():
+        return stock.dumps([{
+            'id': b.id,
+            'tenant_id': b.tenant_id,
+            'tenant_name': b.tenant.full_name,
+            'bill_type': b.bill_type,
+            'amount': b.amount,
+            'billing_month': b.billing_month,
+            'due_date': b.due_date.isoformat(),
+            'paid_date': b.paid_date.isoformat() if b.paid_date else None,
+            'status': b.status,
+            'created_at': b.created_at.isoformat()
+        } for b in bills], separators=(',', ':'))
+    
+    def after():
+        return app.json.dumps(list(BILL_SCHEMA.dump_many(rows)))
+    
+    if json.loads(before()) != json.loads(after()):
+        raise click.ClickException('The two encoders disagree')
+    for label, fn in (('dicts + stock json', before), ('schema + ' + ('orjson' if orjson else 'stdlib json'), after)):
+        click.echo(f'{label:>20}: {best_time(fn, repeat) * 1000 * 10000 / count:8.2f} ms per 10k bills')
+
+# ==================== RESPONSE COMPRESSION ====================
+
+class ResponseCompressor:
+    """Compresses responses for clients that accept it: brotli when installed and preferred, otherwise gzip.
+
+    Bodies of responses carrying an ETag are cached compressed by (ETag, encoding), so repeat hits on
+    cacheable endpoints skip the compressor. Streamed responses are compressed chunk by chunk.
+    """
+    MIMETYPES = frozenset({'application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/csv'})
+
+    def __init__(self, min_size, gzip_level, brotli_quality, cache_size):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ['br', 'gzip'] if brotli else ['gzip']
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return brotli.Compressor(quality=self.brotli_quality)
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, encoding, data):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        c = self.compressor(encoding)
+        return c.compress(data) + c.flush()
+
+    def compress_stream(self, encoding, chunks):
+        c = self.compressor(encoding)
+        for chunk in chunks:
+            # Flush per chunk so streamed rows still reach the client as they are produced
+            data = c.process(chunk) + c.flush() if encoding == 'br' else c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield c.finish() if encoding == 'br' else c.flush()
+
+    def cached_compress(self, encoding, data, etag):
+        if etag is None:
+            return self.compress(encoding, data)
+        key = (etag, encoding)
+        with self.lock:
+            body = self.cache.get(key)
+            if body is not None:
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                return body
+            self.cache_misses += 1
+        body = self.compress(encoding, data)
+        with self.lock:
+            self.cache[key] = body
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return body
+
+    def apply(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = self.compress_stream(encoding, response.iter_encoded())
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            body = self.cached_compress(encoding, data, response.get_etag()[0])
+            self.bytes_in += len(data)
+            self.bytes_out += len(body)
+            response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def snapshot(self):
+        return {
+            'encodings': self.encodings,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
+
+response_compressor = ResponseCompressor(
+    app.config['COMPRESS_MIN_SIZE'],
+    app.config['COMPRESS_LEVEL'],
+    app.config['COMPRESS_BROTLI_QUALITY'],
+    app.config['COMPRESS_CACHE_SIZE']
+)
+metrics_registry['compression'] = response_compressor.snapshot
+
+@app.after_request
+def _compress_response(response):
+    if app.config['COMPRESS_ENABLED']:
+        return response_compressor.apply(response)
+    return response
+
+def cacheable_response(payload):
+    """JSON with a weak ETag that clients revalidate on every use: a matching If-None-Match gets a 304."""
+    response = jsonify(payload)
+    response.add_etag(weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# ==================== LIST QUERIES ====================
+
+class BadQuery(Exception):
+    pass
+
+@app.errorhandler(BadQuery)
+def handle_bad_query(e):
+    return jsonify({'message': str(e)}), 400
+
+class SortKey:
+    """A sortable column: the SQL expression to order by, how to read it off a row, and how to parse it back from a cursor."""
+    def __init__(self, expr, getter, parse=lambda v: v, nullable=False):
+        self.expr = expr
+        self.getter = getter
+        self.parse = parse
+        self.nullable = nullable
+
+def _parse_date(v):
+    return datetime.fromisoformat(v).date()
+
+def _parse_datetime(v):
+    return datetime.fromisoformat(v)
+
+def column_sort_key(column, parse=lambda v: v):
+    # The bare column keeps its (column, id) index usable; NULLs are handled by keyset_filter
+    return SortKey(column, lambda row: getattr(row, column.key), parse, column.nullable)
+
+def keyset_ranges(key, id_column, value, last_id, descending):
+    """Filters for the rows after (value, last_id) in ORDER BY key, id order, one index range each, in page order.
+
+    NULLs sort where the database puts them (lowest on SQLite, highest on Postgres) so the plain
+    (column, id) index order is used; the NULL rows are their own range rather than an OR that defeats the seek.
+    """
+    nulls_after = (db.engine.dialect.name == 'postgresql') != descending
+    if value is None:
+        same = db.and_(key.expr.is_(None), id_column < last_id if descending else id_column > last_id)
+        return [same] if nulls_after else [same, key.expr.isnot(None)]
+    position = db.tuple_(key.expr, id_column)
+    bound = db.tuple_(db.literal(value, key.expr.type), db.literal(last_id))
+    after = position < bound if descending else position > bound
+    return [after, key.expr.is_(None)] if key.nullable and nulls_after else [after]
+
+def arg_list(name):
+    value = request.args.get(name)
+    return [v for v in value.split(',') if v] if value else []
+
+def arg_typed(name, cast):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise BadQuery(f'Invalid value for {name}')
+
+def encode_cursor(sort, row_key):
+    raw = json.dumps([sort] + row_key, default=lambda v: v.isoformat(), separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise BadQuery('Invalid cursor')
+    return sort, value, last_id
+
+def is_paginated():
+    return 'limit' in request.args or 'cursor' in request.args
+
+def wants_ndjson():
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+
+def is_streaming():
+    """?stream=1 or NDJSON asks for the whole, unpaginated listing to be streamed."""
+    return not is_paginated() and (request.args.get('stream') in ('1', 'true') or wants_ndjson())
+
+def page_limit():
+    limit = arg_typed('limit', int) or app.config['MAX_PAGE_SIZE']
+    return max(1, min(limit, app.config['MAX_PAGE_SIZE']))
+
+def page_queries(query, sort_keys, id_column, default_sort):
+    """query ordered by ?sort= (prefix '-' for descending), as one query per keyset range after ?cursor=, in page order.
+
+    Without a cursor that is just the ordered query. Returns (sort, key, queries); apply_sort_and_page runs them.
+    """
+    sort = request.args.get('sort', default_sort)
+    descending = sort.startswith('-')
+    key = sort_keys.get(sort.lstrip('-'))
+    if key is None:
+        raise BadQuery(f"Unknown sort key. Use one of: {', '.join(sorted(sort_keys))}")
+    if descending:
+        query = query.order_by(key.expr.desc(), id_column.desc())
+    else:
+        query = query.order_by(key.expr.asc(), id_column.asc())
+    
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return sort, key, [query]
+    cursor_sort, value, last_id = decode_cursor(cursor)
+    if cursor_sort != sort:
+        raise BadQuery('Cursor does not match the requested sort')
+    try:
+        value = None if value is None else key.parse(value)
+    except (TypeError, ValueError):
+        raise BadQuery('Invalid cursor')
+    return sort, key, [query.filter(keyset) for keyset in keyset_ranges(key, id_column, value, last_id, descending)]
+
+def apply_sort_and_page(query, sort_keys, id_column, default_sort):
+    """Order query by ?sort= (prefix '-' for descending) and, when paginating, apply ?cursor= and ?limit=.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page or when not paginating.
+    When streaming, rows is a lazy iterator fetched in batches of STREAM_YIELD_PER (a server-side cursor on Postgres).
+    """
+    sort, key, queries = page_queries(query, sort_keys, id_column, default_sort)
+    if is_streaming():
+        return queries[0].yield_per(app.config['STREAM_YIELD_PER']), None
+    if not is_paginated():
+        return queries[0].all(), None
+    
+    limit = page_limit()
+    rows = []
+    for ranged in queries:
+        rows += ranged.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, [key.getter(rows[-1]), rows[-1].id])
+
+def stream_json(items, ndjson):
+    """Encode items as they are produced: a JSON array, or one object per line for NDJSON."""
+    batch = [] if ndjson else ['[']
+    for i, item in enumerate(items):
+        encoded = app.json.dumps(item)
+        batch.append(encoded + '\n' if ndjson else (',' if i else '') + encoded)
+        if len(batch) >= 100:
+            yield ''.join(batch)
+            batch = []
+    batch.append('' if ndjson else ']')
+    yield ''.join(batch)
+
+def list_response(items, next_cursor):
+    """items may be a generator; it is only consumed as the response is sent when streaming."""
+    if is_streaming():
+        ndjson = wants_ndjson()
+        return Response(
+            stream_with_context(stream_json(items, ndjson)),
+            mimetype='application/x-ndjson' if ndjson else 'application/json'
+        )
+    if is_paginated():
+        return jsonify({'items': list(items), 'next_cursor': next_cursor})
+    return jsonify(list(items))
+
+def written_since(model, since, column=None):
+    """Select of column (the model's id by default) for rows of model written after the since cursor."""
+    return db.select(column if column is not None else model.id).where(model.change_seq > since)
+
+# Query arguments that shape a ?since= response without filtering its rows
+SYNC_ARGS = frozenset({'since', 'include'})
+
+def sync_queries(query, id_column, changed, since, tenant_id=None):
+    """(tombstones, rows) that sync_response reads for a since cursor; tombstones is None for since=0."""
+    if not since:
+        return None, query.order_by(id_column)
+    tombstones = db.select(SyncTombstone.row_id).where(SyncTombstone.table_name == id_column.table.name, SyncTombstone.change_seq > since)
+    if tenant_id is not None:
+        tombstones = tombstones.where(SyncTombstone.tenant_id == tenant_id)
+    return tombstones, query.filter(id_column.in_(db.union(*changed(since)))).order_by(id_column)
+
+def sync_tenant_scope(current_user):
+    """The tenant_id whose deletions a caller's sync reports: None (all of them) for admins."""
+    return None if current_user.role == 'admin' else current_user.tenant_id
+
+def sync_response(query, id_column, changed, schema, tenant_id=None):
+    """?since=<cursor> mode of a listing: rows written after the cursor, ids deleted after it, and the cursor to send next.
+
+    changed(since) returns selects of the changed ids, one per index: the rows written after since, and rows whose
+    joined fields come from a changed row. Their UNION keeps each on its index where an OR would scan the table.
+    tenant_id limits the deletions reported to that tenant's rows. Sorting and paging do not apply, and list
+    filters are refused: a row that stopped matching one would never be reported. A row may come back in two
+    consecutive responses but is never missed. A cursor older than the pruned tombstones gets 410.
+    """
+    since = arg_typed('since', int)
+    if since is None or since < 0:
+        raise BadQuery('since must be 0 or the cursor of a previous response')
+    filters = set(request.args) - SYNC_ARGS
+    if filters:
+        raise BadQuery(f"since cannot be combined with {', '.join(sorted(filters))}; filter the synced rows on the client")
+    # Read first: anything committed from here on is above the cursor and is sent again next time
+    cursor = current_change_seq()
+    deleted = set()
+    tombstones, rows = sync_queries(query, id_column, changed, since, tenant_id)
+    if since:
+        deleted.update(db.session.scalars(tombstones))
+        # Read after the tombstones, so a prune that raced with the read is noticed
+        if since < sync_horizon():
+            return jsonify({'message': 'Cursor is older than the retained deletions; resync with since=0'}), 410
+    items = list(schema.dump_many(rows))
+    # Read after the tombstones, so a row that exists now wins over a deletion of the same (reused) id
+    deleted.difference_update(item['id'] for item in items)
+    return jsonify({'items': items, 'deleted': sorted(deleted), 'cursor': cursor})
+
+# Sort keys accepted by the list endpoints' ?sort= parameter
+ROOM_SORT_KEYS = {
+    'id': column_sort_key(Room.id),
+    'room_number': column_sort_key(Room.room_number),
+    'rent_amount': column_sort_key(Room.rent_amount),
+    'floor_number': column_sort_key(Room.floor_number)
+}
+TENANT_SORT_KEYS = {
+    'id': column_sort_key(Tenant.id),
+    'full_name': column_sort_key(Tenant.full_name),
+    'lease_end_date': column_sort_key(Tenant.lease_end_date, _parse_date),
+    'created_at': column_sort_key(Tenant.created_at, _parse_datetime)
+}
+BILL_SORT_KEYS = {
+    'id': column_sort_key(Bill.id),
+    'due_date': column_sort_key(Bill.due_date, _parse_date),
+    'billing_month': column_sort_key(Bill.billing_month),
+    'amount': column_sort_key(Bill.amount),
+    'created_at': column_sort_key(Bill.created_at, _parse_datetime)
+}
+COMPLAINT_SORT_KEYS = {
+    'id': column_sort_key(Complaint.id),
+    'created_at': column_sort_key(Complaint.created_at, _parse_datetime),
+    'updated_at': column_sort_key(Complaint.updated_at, _parse_datetime)
+}
+
 # Auth Routes
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -189,7 +1942,7 @@ def register():
     user = User(
         username=data['username'],
         email=data['email'],
-        password_hash=generate_password_hash(data['password']),
+        password_hash=hash_password(data['password']),
         role=data.get('role', 'tenant')
     )
     db.session.add(user)
@@ -202,12 +1955,12 @@ def login():
     data = request.json
     user = User.query.filter_by(username=data['username']).first()
     
-    if user and check_password_hash(user.password_hash, data['password']):
-        token = jwt.encode({
-            'user_id': user.id,
-            'role': user.role,
-            'exp': datetime.utcnow() + timedelta(days=7)
-        }, app.config['SECRET_KEY'])
+    if user and verify_password(user.password_hash, data['password']):
+        # Upgrade hashes made with older KDF parameters while we still have the plaintext
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = hash_password(data['password'])
+            db.session.commit()
+        token = issue_token(user)
         
         return jsonify({
             'token': token,
@@ -224,16 +1977,33 @@ def login():
 # Building Routes
 @app.route('/api/buildings', methods=['GET'])
 @token_required
+@conditional('building', 'room')
+@cached('building', 'room')
 def get_buildings(current_user):
-    buildings = Building.query.all()
+    occupied = db.case((Room.status == 'occupied', 1), else_=0)
+    query = db.session.query(
+        Building,
+        db.func.count(Room.id),
+        db.func.coalesce(db.func.sum(occupied), 0),
+        # Rent roll counts the rent currently owed by occupied units
+        db.func.coalesce(db.func.sum(Room.rent_amount * occupied), 0)
+    ).outerjoin(Room, Room.building_id == Building.id).group_by(Building.id).order_by(Building.id)
+    building_types = arg_list('building_type')
+    if building_types:
+        query = query.filter(Building.building_type.in_(building_types))
+    
     return jsonify([{
         'id': b.id,
         'name': b.name,
         'address': b.address,
         'total_floors': b.total_floors,
         'building_type': b.building_type,
-        'room_count': len(b.rooms)
-    } for b in buildings])
+        'room_count': room_count,
+        'occupied_count': occupied_count,
+        'vacant_count': room_count - occupied_count,
+        'total_rent_roll': rent_roll,
+        'occupancy_pct': round(occupied_count * 100 / room_count, 1) if room_count else 0
+    } for b, room_count, occupied_count, rent_roll in query])
 
 @app.route('/api/buildings', methods=['POST'])
 @token_required
@@ -273,30 +2043,46 @@ def delete_building(current_user, building_id):
     return jsonify({'message': 'Building deleted'})
 
 # Room Routes
+def room_list_schema():
+    # Photos and descriptions are large and unused by the listing pages; ?include=details adds them
+    return ROOM_DETAIL_SCHEMA if 'details' in arg_list('include') else ROOM_SCHEMA
+
+def room_list_query(current_user):
+    """The /api/rooms select with the request's filters, before sorting and paging."""
+    query = room_list_schema().query().join(Building, Room.building_id == Building.id)
+    building_id = arg_typed('building_id', int)
+    if building_id:
+        query = query.filter(Room.building_id == building_id)
+    for name, column in (('status', Room.status), ('room_type', Room.room_type), ('category', Room.category)):
+        values = arg_list(name)
+        if values:
+            query = query.filter(column.in_(values))
+    min_rent = arg_typed('min_rent', float)
+    if min_rent is not None:
+        query = query.filter(Room.rent_amount >= min_rent)
+    max_rent = arg_typed('max_rent', float)
+    if max_rent is not None:
+        query = query.filter(Room.rent_amount <= max_rent)
+    return query
+
+def room_changes(since):
+    return [
+        written_since(Room, since),
+        db.select(Room.id).where(Room.building_id.in_(written_since(Building, since))),
+        written_since(Tenant, since, Tenant.room_id)
+    ]
+
 @app.route('/api/rooms', methods=['GET'])
 @token_required
+@cached('room', 'building', 'tenant')
 def get_rooms(current_user):
-    building_id = request.args.get('building_id')
-    if building_id:
-        rooms = Room.query.filter_by(building_id=building_id).all()
-    else:
-        rooms = Room.query.all()
+    schema = room_list_schema()
+    query = room_list_query(current_user)
+    if 'since' in request.args:
+        return sync_response(query, Room.id, room_changes, schema)
     
-    return jsonify([{
-        'id': r.id,
-        'building_id': r.building_id,
-        'building_name': r.building.name,
-        'room_number': r.room_number,
-        'room_type': r.room_type,
-        'floor_number': r.floor_number,
-        'area_sqft': r.area_sqft,
-        'rent_amount': r.rent_amount,
-        'status': r.status,
-        'category': r.category,
-        'photos': r.photos,
-        'description': r.description,
-        'tenant_name': r.tenant.full_name if r.tenant else None
-    } for r in rooms])
+    rooms, next_cursor = apply_sort_and_page(query, ROOM_SORT_KEYS, Room.id, 'id')
+    return list_response(schema.dump_many(rooms), next_cursor)
 
 @app.route('/api/rooms', methods=['POST'])
 @token_required
@@ -368,26 +2154,42 @@ def upload_room_photos(current_user, room_id):
     return jsonify({'message': 'Photos uploaded', 'photos': existing_photos})
 
 # Tenant Routes
+def tenant_list_query(current_user):
+    """The /api/tenants select with the caller's scope and the request's filters, before sorting and paging."""
+    query = TENANT_SCHEMA.query().outerjoin(Room, Tenant.room_id == Room.id).outerjoin(Building, Room.building_id == Building.id)
+    if current_user.role != 'admin':
+        query = query.filter(Tenant.id == current_user.tenant_id)
+    room_filters = []
+    building_id = arg_typed('building_id', int)
+    if building_id:
+        room_filters.append(Room.building_id == building_id)
+    min_rent = arg_typed('min_rent', float)
+    if min_rent is not None:
+        room_filters.append(Room.rent_amount >= min_rent)
+    max_rent = arg_typed('max_rent', float)
+    if max_rent is not None:
+        room_filters.append(Room.rent_amount <= max_rent)
+    if room_filters:
+        query = query.filter(Tenant.room.has(db.and_(*room_filters)))
+    return query
+
+def tenant_changes(since):
+    return [
+        written_since(Tenant, since),
+        db.select(Tenant.id).where(Tenant.room_id.in_(written_since(Room, since))),
+        db.select(Tenant.id).where(Tenant.room_id.in_(db.select(Room.id).where(Room.building_id.in_(written_since(Building, since)))))
+    ]
+
 @app.route('/api/tenants', methods=['GET'])
 @token_required
+@cached('tenant', 'room', 'building')
 def get_tenants(current_user):
-    if current_user.role == 'admin':
-        tenants = Tenant.query.all()
-    else:
-        tenants = [current_user.tenant] if current_user.tenant else []
+    query = tenant_list_query(current_user)
+    if 'since' in request.args:
+        return sync_response(query, Tenant.id, tenant_changes, TENANT_SCHEMA, tenant_id=sync_tenant_scope(current_user))
     
-    return jsonify([{
-        'id': t.id,
-        'full_name': t.full_name,
-        'phone': t.phone,
-        'email': t.email,
-        'room_number': t.room.room_number if t.room else None,
-        'building_name': t.room.building.name if t.room else None,
-        'rent_amount': t.room.rent_amount if t.room else None,
-        'lease_start_date': t.lease_start_date.isoformat() if t.lease_start_date else None,
-        'lease_end_date': t.lease_end_date.isoformat() if t.lease_end_date else None,
-        'deposit_amount': t.deposit_amount
-    } for t in tenants])
+    tenants, next_cursor = apply_sort_and_page(query, TENANT_SORT_KEYS, Tenant.id, 'id')
+    return list_response(TENANT_SCHEMA.dump_many(tenants), next_cursor)
 
 @app.route('/api/tenants', methods=['POST'])
 @token_required
@@ -399,7 +2201,7 @@ def create_tenant(current_user):
     user = User(
         username=data['username'],
         email=data['email'],
-        password_hash=generate_password_hash(data['password']),
+        password_hash=hash_password(data['password']),
         role='tenant'
     )
     db.session.add(user)
@@ -503,67 +2305,93 @@ def delete_tenant(current_user, tenant_id):
     return jsonify({'message': 'Tenant deleted successfully'})
 
 # Bill Routes
-@app.route('/api/bills', methods=['GET'])
-@token_required
-def get_bills(current_user):
+def bill_list_query(current_user):
+    """The /api/bills select with the caller's scope and the request's filters, before sorting and paging."""
+    query = BILL_SCHEMA.query().join(Tenant, Bill.tenant_id == Tenant.id)
     if current_user.role == 'admin':
-        tenant_id = request.args.get('tenant_id')
+        tenant_id = arg_typed('tenant_id', int)
         if tenant_id:
-            bills = Bill.query.filter_by(tenant_id=tenant_id).all()
-        else:
-            bills = Bill.query.all()
+            query = query.filter(Bill.tenant_id == tenant_id)
     else:
-        if current_user.tenant:
-            bills = Bill.query.filter_by(tenant_id=current_user.tenant.id).all()
-        else:
-            bills = []
+        query = query.filter(Bill.tenant_id == current_user.tenant_id)
+    for name, column in (('status', Bill.status), ('bill_type', Bill.bill_type)):
+        values = arg_list(name)
+        if values:
+            query = query.filter(column.in_(values))
+    if request.args.get('billing_month_from'):
+        query = query.filter(Bill.billing_month >= request.args['billing_month_from'])
+    if request.args.get('billing_month_to'):
+        query = query.filter(Bill.billing_month <= request.args['billing_month_to'])
+    return query
+
+def bill_changes(since):
+    return [
+        written_since(Bill, since),
+        db.select(Bill.id).where(Bill.tenant_id.in_(written_since(Tenant, since)))
+    ]
+
+@app.route('/api/bills', methods=['GET'])
+@token_required
+@cached('bill', 'tenant')
+def get_bills(current_user):
+    query = bill_list_query(current_user)
+    if 'since' in request.args:
+        return sync_response(query, Bill.id, bill_changes, BILL_SCHEMA, tenant_id=sync_tenant_scope(current_user))
     
-    return jsonify([{
-        'id': b.id,
-        'tenant_id': b.tenant_id,
-        'tenant_name': b.tenant.full_name,
-        'bill_type': b.bill_type,
-        'amount': b.amount,
-        'billing_month': b.billing_month,
-        'due_date': b.due_date.isoformat(),
-        'paid_date': b.paid_date.isoformat() if b.paid_date else None,
-        'status': b.status,
-        'created_at': b.created_at.isoformat()
-    } for b in bills])
+    bills, next_cursor = apply_sort_and_page(query, BILL_SORT_KEYS, Bill.id, 'id')
+    return list_response(BILL_SCHEMA.dump_many(bills), next_cursor)
+
+def insert_ignoring_duplicates(table):
+    """INSERT that silently skips rows hitting a unique constraint, on both SQLite and Postgres."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return db.insert(table).prefix_with('IGNORE')
+
+def generate_rent_for_month(billing_month, due_date):
+    """Create one rent bill per tenant with a room in a single INSERT ... SELECT. Returns (created, skipped)."""
+    source = db.select(
+        Tenant.id,
+        db.literal('rent'),
+        Room.rent_amount,
+        db.literal(billing_month),
+        db.literal(due_date, db.Date),
+        db.literal('pending'),
+        db.literal(datetime.utcnow(), db.DateTime)
+    ).join(Room, Tenant.room_id == Room.id)
+    stmt = insert_ignoring_duplicates(Bill).from_select(
+        ['tenant_id', 'bill_type', 'amount', 'billing_month', 'due_date', 'status', 'created_at'],
+        source
+    )
+    eligible = db.session.execute(
+        db.select(db.func.count()).select_from(Tenant).join(Room, Tenant.room_id == Room.id)
+    ).scalar()
+    created = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return created, eligible - created
 
 @app.route('/api/bills/generate-rent', methods=['POST'])
 @token_required
 @admin_required
 def generate_rent_bills(current_user):
     """Generate monthly rent bills for all tenants on the 1st"""
-    tenants = Tenant.query.filter(Tenant.room_id.isnot(None)).all()
-    bills_created = 0
-    
-    current_date = datetime.now()
-    billing_month = current_date.strftime('%Y-%m')
-    due_date = datetime(current_date.year, current_date.month, 6).date()
-    
-    for tenant in tenants:
-        # Check if bill already exists for this month
-        existing_bill = Bill.query.filter_by(
-            tenant_id=tenant.id,
-            bill_type='rent',
-            billing_month=billing_month
-        ).first()
-        
-        if not existing_bill and tenant.room:
-            bill = Bill(
-                tenant_id=tenant.id,
-                bill_type='rent',
-                amount=tenant.room.rent_amount,
-                billing_month=billing_month,
-                due_date=due_date
-            )
-            db.session.add(bill)
-            bills_created += 1
+    data = request.get_json(silent=True) or {}
+    billing_month = data.get('billing_month') or datetime.now().strftime('%Y-%m')
+    try:
+        year, month = (int(p) for p in billing_month.split('-'))
+        due_date = datetime(year, month, 6).date()
+    except ValueError:
+        return jsonify({'message': 'billing_month must be YYYY-MM'}), 400
     
-    db.session.commit()
-    return jsonify({'message': f'{bills_created} rent bills generated'})
+    if data.get('background'):
+        job = enqueue_job('generate-rent', {'billing_month': billing_month}, current_user.id)
+        db.session.commit()
+        return jsonify({'message': 'Rent generation queued', 'job': job_response(job)}), 202
+    
+    created, skipped = generate_rent_for_month(billing_month, due_date)
+    return jsonify({'message': f'{created} rent bills generated', 'created': created, 'skipped': skipped})
 
 @app.route('/api/bills', methods=['POST'])
 @token_required
@@ -578,7 +2406,11 @@ def create_bill(current_user):
         due_date=datetime.fromisoformat(data['due_date']).date()
     )
     db.session.add(bill)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'A rent bill already exists for this tenant and month'}), 400
     return jsonify({'message': 'Bill created', 'id': bill.id}), 201
 
 @app.route('/api/bills/<int:bill_id>', methods=['DELETE'])
@@ -596,7 +2428,7 @@ def pay_bill(current_user, bill_id):
     bill = Bill.query.get_or_404(bill_id)
     
     # Check authorization
-    if current_user.role != 'admin' and (not current_user.tenant or bill.tenant_id != current_user.tenant.id):
+    if current_user.role != 'admin' and bill.tenant_id != current_user.tenant_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
     bill.status = 'paid'
@@ -605,38 +2437,43 @@ def pay_bill(current_user, bill_id):
     return jsonify({'message': 'Bill marked as paid'})
 
 # Complaint Routes
+def complaint_list_query(current_user):
+    """The /api/complaints select with the caller's scope and the request's filters, before sorting and paging."""
+    query = COMPLAINT_SCHEMA.query().join(Tenant, Complaint.tenant_id == Tenant.id)
+    if current_user.role != 'admin':
+        query = query.filter(Complaint.tenant_id == current_user.tenant_id)
+    for name, column in (('status', Complaint.status), ('category', Complaint.category)):
+        values = arg_list(name)
+        if values:
+            query = query.filter(column.in_(values))
+    return query
+
+def complaint_changes(since):
+    return [
+        written_since(Complaint, since),
+        db.select(Complaint.id).where(Complaint.tenant_id.in_(written_since(Tenant, since)))
+    ]
+
 @app.route('/api/complaints', methods=['GET'])
 @token_required
+@cached('complaint', 'tenant')
 def get_complaints(current_user):
-    if current_user.role == 'admin':
-        complaints = Complaint.query.order_by(Complaint.created_at.desc()).all()
-    else:
-        if current_user.tenant:
-            complaints = Complaint.query.filter_by(tenant_id=current_user.tenant.id).order_by(Complaint.created_at.desc()).all()
-        else:
-            complaints = []
+    query = complaint_list_query(current_user)
+    if 'since' in request.args:
+        return sync_response(query, Complaint.id, complaint_changes, COMPLAINT_SCHEMA, tenant_id=sync_tenant_scope(current_user))
     
-    return jsonify([{
-        'id': c.id,
-        'tenant_name': c.tenant.full_name,
-        'subject': c.subject,
-        'description': c.description,
-        'category': c.category,
-        'status': c.status,
-        'admin_reply': c.admin_reply,
-        'created_at': c.created_at.isoformat(),
-        'updated_at': c.updated_at.isoformat()
-    } for c in complaints])
+    complaints, next_cursor = apply_sort_and_page(query, COMPLAINT_SORT_KEYS, Complaint.id, '-created_at')
+    return list_response(COMPLAINT_SCHEMA.dump_many(complaints), next_cursor)
 
 @app.route('/api/complaints', methods=['POST'])
 @token_required
 def create_complaint(current_user):
-    if not current_user.tenant:
+    if not current_user.tenant_id:
         return jsonify({'message': 'Only tenants can create complaints'}), 403
     
     data = request.json
     complaint = Complaint(
-        tenant_id=current_user.tenant.id,
+        tenant_id=current_user.tenant_id,
         subject=data['subject'],
         description=data['description'],
         category=data.get('category', 'other')
@@ -659,16 +2496,11 @@ def reply_complaint(current_user, complaint_id):
 # Emergency Contacts
 @app.route('/api/emergency-contacts', methods=['GET'])
 @token_required
+@conditional('emergency_contact')
+@cached('emergency_contact')
 def get_emergency_contacts(current_user):
-    contacts = EmergencyContact.query.all()
-    return jsonify([{
-        'id': c.id,
-        'service_type': c.service_type,
-        'contact_name': c.contact_name,
-        'phone_number': c.phone_number,
-        'alternate_phone': c.alternate_phone,
-        'available_24x7': c.available_24x7
-    } for c in contacts])
+    contacts = db.session.execute(db.select(*EMERGENCY_CONTACT_SCHEMA.columns))
+    return jsonify(list(EMERGENCY_CONTACT_SCHEMA.dump_many(contacts)))
 
 @app.route('/api/emergency-contacts', methods=['POST'])
 @token_required
@@ -712,15 +2544,15 @@ def delete_emergency_contact(current_user, contact_id):
 # Announcements
 @app.route('/api/announcements', methods=['GET'])
 @token_required
+@conditional('announcement')
+@cached('announcement')
 def get_announcements(current_user):
-    announcements = Announcement.query.order_by(Announcement.created_at.desc()).limit(20).all()
-    return jsonify([{
-        'id': a.id,
-        'title': a.title,
-        'message': a.message,
-        'priority': a.priority,
-        'created_at': a.created_at.isoformat()
-    } for a in announcements])
+    if 'since' in request.args:
+        return sync_response(ANNOUNCEMENT_SCHEMA.query(), Announcement.id, lambda since: [written_since(Announcement, since)], ANNOUNCEMENT_SCHEMA)
+    announcements = db.session.execute(
+        db.select(*ANNOUNCEMENT_SCHEMA.columns).order_by(Announcement.created_at.desc()).limit(20)
+    )
+    return jsonify(list(ANNOUNCEMENT_SCHEMA.dump_many(announcements)))
 
 @app.route('/api/announcements', methods=['POST'])
 @token_required
@@ -737,34 +2569,65 @@ def create_announcement(current_user):
     return jsonify({'message': 'Announcement created', 'id': announcement.id}), 201
 
 # Dashboard Stats
-@app.route('/api/dashboard/stats', methods=['GET'])
-@token_required
-@admin_required
-def get_dashboard_stats(current_user):
-    total_buildings = Building.query.count()
-    total_rooms = Room.query.count()
-    occupied_rooms = Room.query.filter_by(status='occupied').count()
-    total_tenants = Tenant.query.count()
-    pending_bills = Bill.query.filter_by(status='pending').count()
-    open_complaints = Complaint.query.filter_by(status='open').count()
+dashboard_cache = SingleFlightCache(app.config['DASHBOARD_CACHE_TTL'])
+metrics_registry['dashboard_cache'] = dashboard_cache.snapshot
+DASHBOARD_TABLES = {'building', 'room', 'tenant', 'bill', 'complaint'}
+
+def _invalidate_dashboard(tables):
+    if tables & DASHBOARD_TABLES:
+        dashboard_cache.clear()
+
+commit_listeners.append(_invalidate_dashboard)
+
+def dashboard_stats_query(current_month):
+    """Every dashboard figure in one statement of scalar subqueries, each answered by its own index."""
+    def count(model, *criteria):
+        return db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
     
-    # Monthly revenue
-    current_month = datetime.now().strftime('%Y-%m')
-    monthly_revenue = db.session.query(db.func.sum(Bill.amount)).filter(
-        Bill.billing_month == current_month,
-        Bill.bill_type == 'rent'
-    ).scalar() or 0
+    return db.select(
+        count(Building),
+        count(Room),
+        count(Room, Room.status == 'occupied'),
+        count(Tenant),
+        count(Bill, Bill.status.in_(['pending', 'overdue'])),
+        count(Bill, Bill.status == 'overdue'),
+        count(Complaint, Complaint.status == 'open'),
+        db.select(db.func.coalesce(db.func.sum(Bill.amount), 0)).where(
+            Bill.billing_month == current_month,
+            Bill.bill_type == 'rent'
+        ).scalar_subquery()
+    )
+
+def compute_dashboard_stats(current_month):
+    row = db.session.execute(dashboard_stats_query(current_month)).one()
+    total_buildings, total_rooms, occupied_rooms, total_tenants, pending_bills, overdue_bills, open_complaints, monthly_revenue = row
     
-    return jsonify({
+    return {
         'total_buildings': total_buildings,
         'total_rooms': total_rooms,
         'occupied_rooms': occupied_rooms,
         'vacant_rooms': total_rooms - occupied_rooms,
         'total_tenants': total_tenants,
         'pending_bills': pending_bills,
+        'overdue_bills': overdue_bills,
         'open_complaints': open_complaints,
         'monthly_revenue': monthly_revenue
-    })
+    }
+
+@app.route('/api/dashboard/stats', methods=['GET'])
+@token_required
+@admin_required
+def get_dashboard_stats(current_user):
+    # Monthly revenue
+    current_month = datetime.now().strftime('%Y-%m')
+    stats = dashboard_cache.get_or_compute(current_month, lambda: compute_dashboard_stats(current_month))
+    return jsonify(stats)
+
+@app.route('/api/metrics', methods=['GET'])
+@token_required
+@admin_required
+def get_metrics(current_user):
+    return jsonify({name: snapshot() for name, snapshot in metrics_registry.items()})
 
 @app.route('/api/uploads/<path:filename>')
 def uploaded_file(filename):
@@ -773,7 +2636,7 @@ def uploaded_file(filename):
 # Initialize database
 @app.route('/api/init-db', methods=['POST'])
 def init_db():
-    db.create_all()
+    upgrade_schema()
     
     # Create default admin if doesn't exist
     admin = User.query.filter_by(username='admin').first()
@@ -781,7 +2644,7 @@ def init_db():
         admin = User(
             username='admin',
             email='admin@rental.com',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=hash_password('admin123'),
             role='admin'
         )
         db.session.add(admin)
@@ -803,10 +2666,73 @@ def init_db():
     
     return jsonify({'message': 'Database initialized'}), 200
 
+# ==================== OVERDUE SWEEPER ====================
+
+class OverdueSweeper:
+    """Flips pending bills past their due date to 'overdue', one bulk UPDATE per batch."""
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.total_swept = 0
+        self.last_run_at = None
+        self.last_swept = 0
+
+    def due(self, today):
+        return db.and_(Bill.status == 'pending', Bill.due_date < today)
+
+    def batch_query(self, today):
+        # Walks ix_bill_status_due_date
+        return db.select(Bill.id).where(self.due(today)).order_by(Bill.due_date).limit(self.batch_size)
+
+    def sweep_batch(self, today):
+        due = self.due(today)
+        ids = db.session.execute(self.batch_query(today)).scalars().all()
+        if not ids:
+            return 0, 0
+        # The predicate is repeated so a bill paid meanwhile, or swept by another worker, is left alone
+        changed = db.session.execute(
+            db.update(Bill).where(Bill.id.in_(ids), due).values(status='overdue')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return len(ids), changed
+
+    def sweep(self):
+        """Sweep until no overdue pending bills remain. Returns how many bills this call changed."""
+        today = datetime.now().date()
+        swept = 0
+        while True:
+            selected, changed = self.sweep_batch(today)
+            swept += changed
+            if selected < self.batch_size:
+                break
+        self.total_swept += swept
+        self.last_swept = swept
+        self.last_run_at = datetime.utcnow()
+        if swept:
+            print(f"Marked {swept} bills overdue")
+        return swept
+
+    def snapshot(self):
+        return {
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_swept': self.last_swept,
+            'total_swept': self.total_swept
+        }
+
+overdue_sweeper = OverdueSweeper(app.config['OVERDUE_SWEEP_BATCH_SIZE'])
+metrics_registry['overdue_sweeper'] = overdue_sweeper.snapshot
+
+@app.cli.command('sweep-overdue')
+def sweep_overdue_command():
+    """Mark every pending bill past its due date as overdue."""
+    click.echo(f"{overdue_sweeper.sweep()} bills marked overdue")
+
 # ==================== PAYMENT SETTINGS ROUTES ====================
 
 @app.route('/api/payment-settings', methods=['GET'])
 @token_required
+@conditional('payment_settings')
+@cached('payment_settings')
 def get_payment_settings(current_user):
     settings = PaymentSettings.query.first()
     if not settings:
@@ -863,7 +2789,7 @@ def upload_payment_screenshot(current_user, bill_id):
     bill = Bill.query.get_or_404(bill_id)
     
     # Check authorization
-    if current_user.role != 'admin' and (not current_user.tenant or bill.tenant_id != current_user.tenant.id):
+    if current_user.role != 'admin' and bill.tenant_id != current_user.tenant_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
     if 'screenshot' not in request.files:
@@ -889,7 +2815,7 @@ def mark_bill_paid_with_screenshot(current_user, bill_id):
     bill = Bill.query.get_or_404(bill_id)
     
     # Check authorization
-    if current_user.role != 'admin' and (not current_user.tenant or bill.tenant_id != current_user.tenant.id):
+    if current_user.role != 'admin' and bill.tenant_id != current_user.tenant_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
     # Check if screenshot is uploaded
@@ -909,7 +2835,7 @@ def get_bill_receipt(current_user, bill_id):
     bill = Bill.query.get_or_404(bill_id)
     
     # Check authorization
-    if current_user.role != 'admin' and (not current_user.tenant or bill.tenant_id != current_user.tenant.id):
+    if current_user.role != 'admin' and bill.tenant_id != current_user.tenant_id:
         return jsonify({'message': 'Unauthorized'}), 403
     
     tenant = bill.tenant
@@ -931,25 +2857,16 @@ def get_bill_receipt(current_user, bill_id):
         'status': bill.status
     }
     
-    return jsonify(receipt_data)
+    return cacheable_response(receipt_data)
 
 # ==================== ROOMS BY BUILDING ====================
 
 @app.route('/api/buildings/<int:building_id>/rooms', methods=['GET'])
 @token_required
+@cached('room', 'tenant')
 def get_rooms_by_building(current_user, building_id):
-    rooms = Room.query.filter_by(building_id=building_id).all()
-    return jsonify([{
-        'id': r.id,
-        'room_number': r.room_number,
-        'room_type': r.room_type,
-        'floor_number': r.floor_number,
-        'area_sqft': r.area_sqft,
-        'rent_amount': r.rent_amount,
-        'status': r.status,
-        'category': r.category,
-        'tenant_name': r.tenant.full_name if r.tenant else None
-    } for r in rooms])
+    rooms = db.session.execute(db.select(*BUILDING_ROOM_SCHEMA.columns).where(Room.building_id == building_id))
+    return jsonify(list(BUILDING_ROOM_SCHEMA.dump_many(rooms)))
 
 # ==================== ANNOUNCEMENT EDIT/DELETE ====================
 
@@ -1036,7 +2953,7 @@ def admin_upload_tenant_photo(current_user, tenant_id):
 @app.route('/api/tenant/my-documents', methods=['GET'])
 @token_required
 def get_my_documents(current_user):
-    if not current_user.tenant:
+    if not current_user.tenant_id:
         return jsonify({'message': 'Not a tenant'}), 403
     
     tenant = current_user.tenant
@@ -1055,8 +2972,10 @@ def get_my_documents(current_user):
 
 @app.route('/api/tenant/my-profile', methods=['GET'])
 @token_required
+@conditional('tenant', 'room', 'building', per_user=True)
+@cached('tenant', 'room', 'building')
 def get_my_profile(current_user):
-    if not current_user.tenant:
+    if not current_user.tenant_id:
         return jsonify({'message': 'Not a tenant'}), 403
     
     tenant = current_user.tenant
@@ -1086,42 +3005,730 @@ def get_my_profile(current_user):
     })
 
 
+# ==================== PAYMENT GATEWAY ====================
+
+class GatewayUnavailable(Exception):
+    pass
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and lets one trial call through every `reset_timeout` seconds."""
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+class PaymentGateway:
+    """Razorpay client over a pooled session with timeouts, jittered retries for idempotent calls and a circuit breaker."""
+    # Errors that say the gateway is unhealthy; a BadRequestError is the caller's fault and does not count
+    TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ServerError, GatewayError)
+
+    def __init__(self, key_id, key_secret, base_url, connect_timeout, read_timeout, max_retries, pool_size, breaker):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret), base_url=base_url)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self.latency = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name):
+        with self._lock:
+            return self.latency.setdefault(name, LatencyHistogram())
+
+    def call(self, name, fn, *args, idempotent=False, **kwargs):
+        """Invoke a client method such as `client.order.create`; `name` labels its latency histogram."""
+        kwargs.setdefault('timeout', self.timeout)
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise GatewayUnavailable('Payment gateway temporarily unavailable')
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BadRequestError:
+                self.breaker.record_success()
+                raise
+            except self.TRANSIENT_ERRORS as e:
+                self.breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise GatewayUnavailable(str(e))
+                # Full jitter keeps retries from many workers from arriving in lockstep
+                time.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+            except BaseException:
+                # Anything else (an undecodable response, a killed greenlet) still ends a half-open trial
+                self.breaker.record_failure()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._histogram(name).record(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            calls = {name: histogram.snapshot() for name, histogram in self.latency.items()}
+        return {'breaker': self.breaker.state, 'consecutive_failures': self.breaker.failures, 'calls': calls}
+
+try:
+    payment_gateway = PaymentGateway(
+        RAZORPAY_KEY_ID,
+        RAZORPAY_KEY_SECRET,
+        app.config['RAZORPAY_BASE_URL'],
+        app.config['RAZORPAY_CONNECT_TIMEOUT'],
+        app.config['RAZORPAY_READ_TIMEOUT'],
+        app.config['RAZORPAY_MAX_RETRIES'],
+        app.config['RAZORPAY_POOL_SIZE'],
+        CircuitBreaker(app.config['RAZORPAY_BREAKER_THRESHOLD'], app.config['RAZORPAY_BREAKER_RESET'])
+    )
+    razorpay_client = payment_gateway.client
+    metrics_registry['payment_gateway'] = payment_gateway.snapshot
+except:
+    payment_gateway = None
+    razorpay_client = None
+
+@app.errorhandler(GatewayUnavailable)
+def handle_gateway_unavailable(e):
+    return jsonify({'message': 'Payment gateway temporarily unavailable, please try again shortly'}), 503
+
 # ==================== NOTIFICATIONS & PAYMENTS ====================
 
+# ==================== EMAIL OUTBOX ====================
+
 def send_email(to, subject, body):
+    """Queue an email in the outbox. It goes out once the caller commits, so handlers never wait on SMTP."""
+    db.session.add(OutboxEmail(recipient=to, subject=subject, body=body))
+
+class SmtpSession:
+    """One SMTP connection kept open across batches and reopened after errors or idling."""
+    MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused)
+
+    def __init__(self, idle_timeout):
+        self.idle_timeout = idle_timeout
+        self._connection = None
+        self._last_used = 0
+
+    def send(self, msg):
+        if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._connection is None:
+            self._connection = mail.connect().__enter__()
+        try:
+            self._connection.send(msg)
+        except self.MESSAGE_ERRORS:
+            # Refused for this message only; SMTPException is an OSError, so this must come before the clause below
+            raise
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.__exit__(None, None, None)
+            except Exception:
+                pass
+            self._connection = None
+
+class EmailOutboxWorker(BackgroundWorker):
+    """Drains the outbox in batches: claims due rows, sends them over one SMTP session and retries with backoff."""
+    name = 'email-outbox'
+    wake_tables = frozenset({'outbox_email'})
+    LEASE = timedelta(minutes=5)  # a 'sending' row older than this belonged to a worker that died
+
+    def __init__(self, batch_size, max_attempts, poll_interval, idle_timeout, run_in_thread):
+        super().__init__(batch_size, poll_interval, run_in_thread)
+        self.max_attempts = max_attempts
+        self.smtp = SmtpSession(idle_timeout)
+        self.send_latency = LatencyStats()
+        self.sent = 0
+        self.failed = 0
+
+    def claim_batch(self):
+        now = datetime.utcnow()
+        due = db.or_(
+            db.and_(OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now),
+            db.and_(OutboxEmail.status == 'sending', OutboxEmail.claimed_at < now - self.LEASE)
+        )
+        return claim_rows(OutboxEmail, due, self.batch_size, status='sending', claimed_at=now)
+
+    def backoff(self, attempts):
+        return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600) * random.uniform(0.8, 1.2))
+
+    def _record_failure(self, email, error):
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= self.max_attempts:
+            email.status = 'failed'
+            self.failed += 1
+        else:
+            email.status = 'pending'
+            email.next_attempt_at = datetime.utcnow() + self.backoff(email.attempts)
+
+    def run_once(self):
+        """Send one batch. Returns the number of emails claimed."""
+        batch = self.claim_batch()
+        for i, email in enumerate(batch):
+            start = time.perf_counter()
+            try:
+                self.smtp.send(Message(email.subject, recipients=[email.recipient], body=email.body))
+            except SmtpSession.MESSAGE_ERRORS as e:
+                self._record_failure(email, e)
+                print(f"Error sending email {email.id}: {e}")
+            except Exception as e:
+                # The server itself is unavailable: back off the rest of the batch instead of reconnecting per email
+                for pending in batch[i:]:
+                    self._record_failure(pending, e)
+                print(f"Error sending emails: {e}")
+                break
+            else:
+                self.send_latency.record(time.perf_counter() - start)
+                email.status = 'sent'
+                email.sent_at = datetime.utcnow()
+                self.sent += 1
+        for email in batch:
+            email.claim_token = None
+        db.session.commit()
+        return len(batch)
+
+    def snapshot(self):
+        counts = dict(db.session.query(OutboxEmail.status, db.func.count()).group_by(OutboxEmail.status).all())
+        return {
+            'queue_depth': counts.get('pending', 0) + counts.get('sending', 0),
+            'failed_total': counts.get('failed', 0),
+            'sent': self.sent,
+            'failed': self.failed,
+            'send_latency': self.send_latency.snapshot()
+        }
+
+email_worker = EmailOutboxWorker(
+    app.config['EMAIL_BATCH_SIZE'],
+    app.config['EMAIL_MAX_ATTEMPTS'],
+    app.config['EMAIL_POLL_INTERVAL'],
+    app.config['EMAIL_SMTP_IDLE_TIMEOUT'],
+    app.config['EMAIL_WORKER_THREAD']
+)
+background_workers.append(email_worker)
+metrics_registry['email_outbox'] = email_worker.snapshot
+
+@app.cli.command('email-worker')
+def email_worker_command():
+    """Send queued emails until interrupted (use with EMAIL_WORKER_THREAD=false)."""
+    email_worker.run_forever()
+
+# ==================== PAYMENT WEBHOOKS ====================
+
+def webhook_signature(body, secret):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+@app.route('/api/payment/webhook', methods=['POST'])
+def razorpay_webhook():
+    """Verify, persist and acknowledge; the webhook worker applies the event to bills later."""
+    secret = app.config['RAZORPAY_WEBHOOK_SECRET']
+    if not secret:
+        return jsonify({'message': 'Webhook secret not configured'}), 503
+    body = request.get_data()
+    signature = request.headers.get('X-Razorpay-Signature', '')
+    if not hmac.compare_digest(webhook_signature(body, secret), signature):
+        return jsonify({'message': 'Invalid signature'}), 400
     try:
-        msg = Message(subject, recipients=[to], body=body)
-        mail.send(msg)
-    except Exception as e:
-        print(f"Error sending email: {e}")
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    # Signed but not an event object ([], "x", 1): reject it rather than fail with a 500 the gateway keeps retrying
+    if not isinstance(payload, dict):
+        return jsonify({'message': 'Invalid payload'}), 400
+    event_type = payload.get('event')
+    
+    event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(body).hexdigest()[:64]
+    db.session.add(WebhookEvent(event_id=event_id, event_type=event_type, payload=body.decode()))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Razorpay redelivers until it sees a 2xx; the first copy is already stored
+        db.session.rollback()
+    return jsonify({'status': 'ok'})
+
+def captured_payment(payload):
+    """(payment_id, order_id, amount, notes) from a payment.captured or order.paid event, or None for other events."""
+    if payload.get('event') not in ('payment.captured', 'order.paid'):
+        return None
+    payment = payload.get('payload', {}).get('payment', {}).get('entity', {})
+    if not payment.get('id'):
+        return None
+    notes = payment.get('notes')
+    return payment['id'], payment.get('order_id'), payment.get('amount'), notes if isinstance(notes, dict) else {}
+
+class WebhookWorker(BackgroundWorker):
+    """Applies stored webhook events to bills in batches, once per payment id."""
+    name = 'payment-webhooks'
+    wake_tables = frozenset({'webhook_event'})
+    LEASE = timedelta(minutes=5)
+
+    def __init__(self, batch_size, poll_interval, run_in_thread):
+        super().__init__(batch_size, poll_interval, run_in_thread)
+        self.applied = 0
+        self.duplicates = 0
+        self.latency = LatencyStats()  # receipt to processing
+
+    def run_once(self):
+        now = datetime.utcnow()
+        due = db.or_(
+            WebhookEvent.status == 'pending',
+            db.and_(WebhookEvent.status == 'processing', WebhookEvent.claimed_at < now - self.LEASE)
+        )
+        events = claim_rows(WebhookEvent, due, self.batch_size, status='processing', claimed_at=now)
+        if not events:
+            return 0
+        
+        parsed = {}
+        for event in events:
+            try:
+                parsed[event.id] = captured_payment(json.loads(event.payload))
+            except (TypeError, ValueError, AttributeError) as e:
+                # A malformed payload fails its own event, not the whole batch
+                event.status = 'failed'
+                event.error = f'unreadable payload: {e}'
+        payments = [p for p in parsed.values() if p]
+        # Resolve every order, bill and already-applied payment id of the batch with one query each
+        orders = {o.gateway_order_id: o for o in PaymentOrder.query.filter(
+            PaymentOrder.gateway_order_id.in_({p[1] for p in payments if p[1]})
+        )}
+        bill_ids = {o.bill_id for o in orders.values()}
+        bill_ids.update(int(p[3]['bill_id']) for p in payments if str(p[3].get('bill_id', '')).isdigit())
+        bills = {b.id: b for b in Bill.query.options(db.joinedload(Bill.tenant)).filter(Bill.id.in_(bill_ids))}
+        seen = set(db.session.execute(
+            db.select(Bill.razorpay_payment_id).where(Bill.razorpay_payment_id.in_({p[0] for p in payments}))
+        ).scalars())
+        
+        for event in events:
+            event.claim_token = None
+            event.processed_at = datetime.utcnow()
+            self.latency.record((event.processed_at - event.received_at).total_seconds())
+            if event.id not in parsed:
+                continue
+            try:
+                self.apply(event, parsed[event.id], orders, bills, seen)
+            except Exception as e:
+                # Checks run before anything is changed, so a bad event leaves no partial update behind
+                event.status = 'failed'
+                event.error = str(e)
+                print(f"Webhook event {event.event_id} failed: {e}")
+        db.session.commit()
+        return len(events)
+
+    def apply(self, event, payment, orders, bills, seen):
+        if payment is None:
+            event.status = 'ignored'
+            return
+        payment_id, order_id, amount, notes = payment
+        if payment_id in seen:
+            event.status = 'ignored'
+            event.error = 'duplicate payment'
+            self.duplicates += 1
+            return
+        order = orders.get(order_id)
+        notes_bill_id = str(notes.get('bill_id', ''))
+        bill = bills.get(order.bill_id if order else int(notes_bill_id) if notes_bill_id.isdigit() else None)
+        if bill is None:
+            event.status = 'failed'
+            event.error = f'no bill for order {order_id}'
+            return
+        # Without an order the amount comes only from the gateway, so always hold it against the bill itself
+        due = int(round(bill.amount * 100))
+        if amount is None or amount < due:
+            event.status = 'failed'
+            event.error = f'captured {amount} but bill is for {due}'
+            return
+        seen.add(payment_id)
+        event.status = 'processed'
+        if order is not None:
+            order.status = 'paid'
+        if bill.status != 'paid':
+            bill.status = 'paid'
+            bill.paid_date = datetime.now().date()
+            bill.payment_screenshot = 'razorpay_auto_verified'
+            send_email(bill.tenant.email, 'Payment Successful - RentEase', f"Your payment of Rs. {bill.amount} for {bill.bill_type} ({bill.billing_month}) was successful.\nTransaction ID: {payment_id}")
+        bill.razorpay_payment_id = payment_id
+        self.applied += 1
+
+    def snapshot(self):
+        counts = dict(db.session.query(WebhookEvent.status, db.func.count()).group_by(WebhookEvent.status).all())
+        return {
+            'queue_depth': counts.get('pending', 0) + counts.get('processing', 0),
+            'statuses': counts,
+            'applied': self.applied,
+            'duplicates': self.duplicates,
+            'receipt_to_apply': self.latency.snapshot()
+        }
+
+webhook_worker = WebhookWorker(
+    app.config['WEBHOOK_BATCH_SIZE'],
+    app.config['WEBHOOK_POLL_INTERVAL'],
+    app.config['WEBHOOK_WORKER_THREAD']
+)
+background_workers.append(webhook_worker)
+metrics_registry['payment_webhooks'] = webhook_worker.snapshot
+
+@app.cli.command('webhook-worker')
+def webhook_worker_command():
+    """Apply stored payment webhooks until interrupted (use with WEBHOOK_WORKER_THREAD=false)."""
+    webhook_worker.run_forever()
+
+@app.cli.command('replay-webhooks')
+@click.option('--url', default='http://localhost:5000/api/payment/webhook', show_default=True)
+@click.option('--file', 'path', type=click.Path(exists=True), help='NDJSON file of webhook bodies; synthetic events for pending bills are generated when omitted.')
+@click.option('--count', default=100, show_default=True, help='Number of synthetic events.')
+@click.option('--duplicates', default=0.1, show_default=True, help='Fraction of events sent twice, to exercise deduplication.')
+@click.option('--concurrency', default=8, show_default=True)
+def replay_webhooks_command(url, path, count, duplicates, concurrency):
+    """Sign and POST webhook events to a running server to load-test ingestion offline."""
+    secret = app.config['RAZORPAY_WEBHOOK_SECRET']
+    if not secret:
+        raise click.ClickException('RAZORPAY_WEBHOOK_SECRET must be set')
+    if path:
+        with open(path) as f:
+            bodies = [line.strip() for line in f if line.strip()]
+    else:
+        bills = Bill.query.filter(Bill.status != 'paid').limit(count).all()
+        bodies = [json.dumps({
+            'entity': 'event',
+            'event': 'payment.captured',
+            'created_at': int(time.time()),
+            'payload': {'payment': {'entity': {
+                'id': f'pay_replay_{uuid.uuid4().hex[:14]}',
+                'order_id': f'order_replay_{bill.id}',
+                'amount': int(round(bill.amount * 100)),
+                'status': 'captured',
+                'notes': {'bill_id': str(bill.id)}
+            }}}
+        }) for bill in bills]
+    bodies += random.sample(bodies, int(len(bodies) * duplicates))
+    random.shuffle(bodies)
+    
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_maxsize=concurrency))
+    session.mount('https://', HTTPAdapter(pool_maxsize=concurrency))
+    def post(body):
+        data = body.encode()
+        event_id = hashlib.sha256(data).hexdigest()[:64]
+        start = time.perf_counter()
+        response = session.post(url, data=data, timeout=10, headers={
+            'Content-Type': 'application/json',
+            'X-Razorpay-Signature': webhook_signature(data, secret),
+            'X-Razorpay-Event-Id': event_id
+        })
+        return response.status_code, time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(post, bodies))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, latency in results)
+    failures = sum(1 for status, _ in results if status != 200)
+    if not latencies:
+        click.echo('No events to send')
+        return
+    click.echo(f"{len(results)} events in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s), {failures} non-200")
+    click.echo(f"ack latency p50={latencies[len(latencies) // 2] * 1000:.1f}ms p95={latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+# ==================== PAYMENT RECONCILIATION ====================
+
+def chunked(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def fetch_gateway_payments(start, end):
+    """Every gateway payment created in [start, end), fetched a page at a time."""
+    page_size = app.config['RECONCILE_PAGE_SIZE']
+    skip = 0
+    while True:
+        page = payment_gateway.call('payment.all', razorpay_client.payment.all, {
+            'from': int(start.timestamp()),
+            'to': int(end.timestamp()) - 1,
+            'count': page_size,
+            'skip': skip
+        }, idempotent=True)
+        items = page.get('items', [])
+        yield from items
+        if len(items) < page_size:
+            return
+        skip += page_size
+
+def reconcile_payments(date_from, date_to, apply_fixes=True):
+    """Match gateway payments for the date range against bills and record a ReconciliationRun.
+
+    Captured payments whose bill is still unpaid are the only discrepancy fixed automatically;
+    everything else is left in the report for an admin to review.
+    """
+    run = ReconciliationRun(range_from=date_from, range_to=date_to, started_at=datetime.utcnow())
+    start = datetime.combine(date_from, datetime.min.time())
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+    payments = {p['id']: p for p in fetch_gateway_payments(start, end)}
+    captured = {pid: p for pid, p in payments.items() if p.get('status') == 'captured'}
+    
+    # Hash indexes over our side, built with chunked IN queries
+    orders_by_gateway_id = {}
+    for chunk in chunked({p.get('order_id') for p in captured.values() if p.get('order_id')}):
+        orders_by_gateway_id.update((o.gateway_order_id, o) for o in PaymentOrder.query.filter(PaymentOrder.gateway_order_id.in_(chunk)))
+    bills_by_payment_id = {}
+    for chunk in chunked(payments):
+        bills_by_payment_id.update((b.razorpay_payment_id, b) for b in Bill.query.filter(Bill.razorpay_payment_id.in_(chunk)))
+    wanted_bill_ids = {o.bill_id for o in orders_by_gateway_id.values()}
+    wanted_bill_ids.update(int(p['notes']['bill_id']) for p in captured.values() if str((p.get('notes') or {}).get('bill_id', '')).isdigit())
+    bills_by_id = {}
+    for chunk in chunked(wanted_bill_ids):
+        bills_by_id.update((b.id, b) for b in Bill.query.filter(Bill.id.in_(chunk)))
+    
+    report = []
+    bill_fixes = {}
+    order_fixes = set()
+    for payment_id, payment in captured.items():
+        order = orders_by_gateway_id.get(payment.get('order_id'))
+        notes_bill_id = (payment.get('notes') or {}).get('bill_id')
+        bill = bills_by_id.get(order.bill_id if order else int(notes_bill_id) if str(notes_bill_id or '').isdigit() else None)
+        recorded = bills_by_payment_id.get(payment_id)
+        if bill is None:
+            if recorded is None:
+                report.append({'type': 'unmatched_payment', 'payment_id': payment_id, 'order_id': payment.get('order_id'), 'amount': payment.get('amount')})
+            continue
+        if recorded is not None and recorded.id != bill.id:
+            report.append({'type': 'payment_on_wrong_bill', 'payment_id': payment_id, 'bill_id': bill.id, 'recorded_bill_id': recorded.id})
+            continue
+        if payment.get('amount', 0) < int(round(bill.amount * 100)):
+            report.append({'type': 'amount_mismatch', 'payment_id': payment_id, 'bill_id': bill.id, 'captured': payment.get('amount'), 'expected': int(round(bill.amount * 100))})
+            continue
+        if bill.status != 'paid' and bill.id not in bill_fixes:
+            report.append({'type': 'captured_not_recorded', 'payment_id': payment_id, 'bill_id': bill.id, 'fixed': apply_fixes})
+            bill_fixes[bill.id] = {
+                'id': bill.id,
+                'status': 'paid',
+                'paid_date': datetime.utcfromtimestamp(payment.get('captured_at') or payment.get('created_at') or time.time()).date(),
+                'payment_screenshot': 'razorpay_auto_verified',
+                'razorpay_payment_id': payment_id
+            }
+            if order is not None and order.status != 'paid':
+                order_fixes.add(order.id)
+    
+    # Bills we consider gateway-paid in this range must have a captured payment behind them
+    paid_bills = Bill.query.filter(
+        Bill.payment_screenshot == 'razorpay_auto_verified',
+        Bill.paid_date >= date_from,
+        Bill.paid_date <= date_to
+    ).all()
+    for bill in paid_bills:
+        payment_id = bill.razorpay_payment_id
+        if not payment_id or payment_id.startswith('pay_mock_'):
+            continue
+        payment = payments.get(payment_id)
+        if payment is None:
+            # Captured just outside the listed window; look it up directly
+            try:
+                payment = payment_gateway.call('payment.fetch', razorpay_client.payment.fetch, payment_id, idempotent=True)
+            except BadRequestError:
+                payment = None
+        if payment is None or payment.get('status') != 'captured':
+            report.append({'type': 'paid_without_capture', 'bill_id': bill.id, 'payment_id': payment_id, 'gateway_status': payment.get('status') if payment else None})
+    
+    if apply_fixes and bill_fixes:
+        db.session.execute(db.update(Bill), list(bill_fixes.values()))
+        if order_fixes:
+            db.session.execute(db.update(PaymentOrder), [{'id': order_id, 'status': 'paid'} for order_id in order_fixes])
+        run.fixes_applied = len(bill_fixes)
+    run.payments_scanned = len(payments)
+    run.discrepancies = len(report)
+    run.report = json.dumps(report)
+    run.finished_at = datetime.utcnow()
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+def reconciliation_response(run):
+    return {
+        'id': run.id,
+        'range_from': run.range_from.isoformat(),
+        'range_to': run.range_to.isoformat(),
+        'payments_scanned': run.payments_scanned,
+        'discrepancies': run.discrepancies,
+        'fixes_applied': run.fixes_applied,
+        'report': json.loads(run.report or '[]'),
+        'started_at': run.started_at.isoformat(),
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None
+    }
+
+@app.route('/api/payment/reconciliation', methods=['GET'])
+@token_required
+@admin_required
+def get_reconciliation_runs(current_user):
+    runs = ReconciliationRun.query.order_by(ReconciliationRun.id.desc()).limit(arg_typed('limit', int) or 10).all()
+    return jsonify([reconciliation_response(r) for r in runs])
+
+@app.route('/api/payment/reconciliation', methods=['POST'])
+@token_required
+@admin_required
+def start_reconciliation(current_user):
+    data = request.get_json(silent=True) or {}
+    yesterday = (datetime.now().date() - timedelta(days=1)).isoformat()
+    payload = {
+        'date_from': data.get('date_from') or yesterday,
+        'date_to': data.get('date_to') or data.get('date_from') or yesterday,
+        'apply_fixes': not data.get('dry_run', False)
+    }
+    try:
+        if datetime.fromisoformat(payload['date_from']) > datetime.fromisoformat(payload['date_to']):
+            raise ValueError
+    except ValueError:
+        return jsonify({'message': 'date_from and date_to must be YYYY-MM-DD, date_from first'}), 400
+    job = enqueue_job('reconcile-payments', payload, current_user.id)
+    db.session.commit()
+    return jsonify({'message': 'Reconciliation queued', 'job': job_response(job)}), 202
+
+@app.cli.command('reconcile-payments')
+@click.option('--from', 'date_from', help='First day (YYYY-MM-DD), default yesterday.')
+@click.option('--to', 'date_to', help='Last day (YYYY-MM-DD), default same as --from.')
+@click.option('--dry-run', is_flag=True, help='Report only, do not fix bills.')
+def reconcile_payments_command(date_from, date_to, dry_run):
+    """Match gateway payments against bills and fix captured payments that never reached us."""
+    if not payment_gateway:
+        raise click.ClickException('Payment gateway not configured')
+    date_from = datetime.fromisoformat(date_from).date() if date_from else datetime.now().date() - timedelta(days=1)
+    date_to = datetime.fromisoformat(date_to).date() if date_to else date_from
+    run = reconcile_payments(date_from, date_to, apply_fixes=not dry_run)
+    click.echo(json.dumps(reconciliation_response(run), indent=2))
+
+# ==================== PAYMENT ORDERS ====================
+
+def order_response(order):
+    response = {
+        'id': order.gateway_order_id,
+        'entity': 'order',
+        'amount': order.amount,
+        'currency': order.currency,
+        'status': 'created',
+        'bill_id': order.bill_id
+    }
+    if order.is_mock:
+        response['mock'] = True
+    return response
+
+def claim_payment_order(bill_id, amount, currency):
+    """Return (order, owned). `owned` means this request must create the gateway order; otherwise order is reusable or None while another request is creating it."""
+    order = PaymentOrder.query.filter_by(bill_id=bill_id, amount=amount, currency=currency).first()
+    if order is None:
+        order = PaymentOrder(bill_id=bill_id, amount=amount, currency=currency, status='creating')
+        db.session.add(order)
+        try:
+            db.session.commit()
+            return order, True
+        except IntegrityError:
+            db.session.rollback()
+            order = PaymentOrder.query.filter_by(bill_id=bill_id, amount=amount, currency=currency).first()
+    if order.status == 'created':
+        return order, False
+    # Take over failed attempts and reservations abandoned by a crashed request. A 'paid' order whose bill is
+    # still unpaid (the bill was reopened, or the update never landed) settles nothing: start it over as a new order
+    stale = datetime.utcnow() - timedelta(seconds=60)
+    bill_unpaid = db.select(Bill.id).where(Bill.id == PaymentOrder.bill_id, Bill.status != 'paid').exists()
+    claimed = db.session.execute(
+        db.update(PaymentOrder)
+        .where(PaymentOrder.id == order.id, db.or_(
+            PaymentOrder.status == 'failed',
+            db.and_(PaymentOrder.status == 'creating', PaymentOrder.updated_at < stale),
+            db.and_(PaymentOrder.status == 'paid', bill_unpaid)
+        ))
+        .values(status='creating', updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    db.session.refresh(order)
+    return (order, True) if claimed else (None, False)
 
 @app.route('/api/payment/create-order', methods=['POST'])
 @token_required
 def create_payment_order(current_user):
-    data = request.json
-    amount = data.get('amount')
-    currency = 'INR'
+    data = request.json or {}
+    if not data.get('bill_id'):
+        return jsonify({'message': 'bill_id is required'}), 400
+    bill = Bill.query.get_or_404(data['bill_id'])
+    if current_user.role != 'admin' and bill.tenant_id != current_user.tenant_id:
+        return jsonify({'message': 'Unauthorized'}), 403
+    if bill.status == 'paid':
+        return jsonify({'message': 'Bill is already paid'}), 400
     
-    # Check if using placeholder keys
-    if RAZORPAY_KEY_ID == 'rzp_test_placeholder':
-        # Return a mock order for testing
-        return jsonify({
-            'id': f'order_mock_{uuid.uuid4().hex[:10]}',
-            'entity': 'order',
-            'amount': int(amount * 100),
-            'currency': currency,
-            'status': 'created',
-            'mock': True
-        })
+    # The amount always comes from the bill, never from the client
+    amount = int(round(bill.amount * 100))
+    currency = 'INR'
+    order, owned = claim_payment_order(bill.id, amount, currency)
+    if order is None:
+        return jsonify({'message': 'Payment is already being initialised, please retry'}), 409
+    if not owned:
+        return jsonify(order_response(order))
     
-    if not razorpay_client:
-        return jsonify({'message': 'Payment gateway not configured'}), 500
-        
     try:
-        order = razorpay_client.order.create(dict(amount=int(amount * 100), currency=currency, payment_capture='1'))
-        return jsonify(order)
+        # Check if using placeholder keys
+        if RAZORPAY_KEY_ID == 'rzp_test_placeholder':
+            # Mock order for testing
+            order.gateway_order_id = f'order_mock_{uuid.uuid4().hex[:10]}'
+            order.is_mock = True
+        else:
+            if not payment_gateway:
+                raise GatewayUnavailable('Payment gateway not configured')
+            # Creating an order is not idempotent, so it is never retried
+            created = payment_gateway.call('order.create', razorpay_client.order.create, dict(
+                amount=amount,
+                currency=currency,
+                receipt=f'bill_{bill.id}_{amount}',
+                notes={'bill_id': str(bill.id)},
+                payment_capture='1'
+            ))
+            order.gateway_order_id = created['id']
+        order.status = 'created'
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
+        order.status = 'failed'
+        db.session.commit()
+        if isinstance(e, GatewayUnavailable):
+            raise
         return jsonify({'message': str(e)}), 400
+    return jsonify(order_response(order))
 
 @app.route('/api/payment/verify', methods=['POST'])
 @token_required
@@ -1133,6 +3740,13 @@ def verify_payment(current_user):
     razorpay_signature = data.get('razorpay_signature')
     
     bill = Bill.query.get_or_404(bill_id)
+    order = PaymentOrder.query.filter_by(gateway_order_id=razorpay_order_id).first()
+    if order is not None and order.bill_id != bill.id:
+        return jsonify({'message': 'Payment verification failed'}), 400
+    
+    if bill.status == 'paid' and bill.razorpay_payment_id == razorpay_payment_id:
+        # Already applied, e.g. by the webhook
+        return jsonify({'message': 'Payment verified successfully'})
     
     try:
         # Verify signature (skip for mock)
@@ -1147,21 +3761,835 @@ def verify_payment(current_user):
         bill.status = 'paid'
         bill.paid_date = datetime.now().date()
         bill.payment_screenshot = 'razorpay_auto_verified' # Marker for system
-        db.session.commit()
+        bill.razorpay_payment_id = razorpay_payment_id
+        if order is not None:
+            order.status = 'paid'
         
-        # Send Notifications
+        # Queue Notifications (committed together with the bill update)
         send_email(current_user.email, 'Payment Successful - RentEase', f"Your payment of Rs. {bill.amount} for {bill.bill_type} ({bill.billing_month}) was successful.\nTransaction ID: {razorpay_payment_id}")
         
         # Notify Admin
         admin = User.query.filter_by(role='admin').first()
         if admin:
             send_email(admin.email, 'New Payment Received', f"Tenant {current_user.username} paid Rs. {bill.amount} via Razorpay.\nBill ID: {bill.id}")
+        db.session.commit()
             
         return jsonify({'message': 'Payment verified successfully'})
-    except Exception as e:
+    except Exception:
         return jsonify({'message': 'Payment verification failed'}), 400
 
+# ==================== SCHEDULER ====================
+
+class CronSchedule:
+    """A five-field cron expression (minute hour day-of-month month day-of-week) in server local time."""
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f'Cron expression needs 5 fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        # As in cron, when both day fields are restricted a match on either is enough
+        self.either_day = parts[2] != '*' and parts[4] != '*'
+
+    @staticmethod
+    def _parse(part, low, high):
+        values = set()
+        for item in part.split(','):
+            spec, _, step = item.partition('/')
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(v) for v in spec.split('-'))
+            else:
+                start = int(spec)
+                end = high if step else start
+            values.update(range(start, end + 1, int(step or 1)))
+        if not values or min(values) < low or max(values) > high:
+            raise ValueError(f'Cron field {part!r} is outside {low}-{high}')
+        return frozenset(values)
+
+    def day_matches(self, t):
+        day = t.day in self.days
+        weekday = (t.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        return (day or weekday) if self.either_day else (day and weekday)
+
+    def next_after(self, after):
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f'Cron expression never fires: {self.expression!r}')
+
+    def fire_times(self, after, until):
+        """Every slot in (after, until]."""
+        t = self.next_after(after)
+        while t <= until:
+            yield t
+            t = self.next_after(t)
+
+class ScheduledTask:
+    def __init__(self, name, schedule, fn, catch_up):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.fn = fn
+        self.catch_up = catch_up
+
+# name -> ScheduledTask
+scheduled_tasks = {}
+
+def scheduled(name, schedule, catch_up=False):
+    """Run fn(scheduled_for) on a cron schedule.
+
+    With catch_up every slot missed while nothing was running is replayed in order, otherwise only the latest runs.
+    """
+    def register(fn):
+        scheduled_tasks[name] = ScheduledTask(name, schedule, fn, catch_up)
+        return fn
+    return register
+
+class Scheduler(BackgroundWorker):
+    """Runs due scheduled tasks. A lease on each task's ScheduledJob row lets exactly one process run it."""
+    name = 'scheduler'
+
+    def __init__(self, tasks, tick, lease_ttl, retry_delay, catch_up_days, run_in_thread):
+        super().__init__(1, tick, run_in_thread)
+        self.tasks = tasks
+        self.lease_ttl = timedelta(seconds=lease_ttl)
+        self.retry_delay = timedelta(seconds=retry_delay)
+        self.catch_up_days = catch_up_days
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def due_slots(self, task, job, now):
+        if job and job.last_status == 'failed' and job.last_finished_at > datetime.utcnow() - self.retry_delay:
+            return []
+        horizon = now - timedelta(days=self.catch_up_days)
+        last = job.last_scheduled_for if job else None
+        slots = list(task.schedule.fire_times(max(last, horizon) if last else horizon, now))
+        if last is None or not task.catch_up:
+            # A job's first run only takes the latest slot, so a fresh deploy does not backfill history
+            return slots[-1:]
+        return slots
+
+    def acquire(self, name):
+        now = datetime.utcnow()
+        taken = db.session.execute(
+            db.update(ScheduledJob)
+            .where(
+                ScheduledJob.name == name,
+                db.or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now, ScheduledJob.lease_owner == self.owner)
+            )
+            .values(lease_owner=self.owner, lease_expires_at=now + self.lease_ttl)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return taken == 1
+
+    def record(self, name, **values):
+        db.session.execute(
+            db.update(ScheduledJob)
+            .where(ScheduledJob.name == name, ScheduledJob.lease_owner == self.owner)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def run_task(self, task, slots):
+        for slot in slots:
+            started = datetime.utcnow()
+            try:
+                task.fn(slot)
+                db.session.commit()
+                error = None
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                print(f"Scheduled job {task.name} failed for {slot}: {e}")
+            finished = datetime.utcnow()
+            values = {
+                'last_started_at': started,
+                'last_finished_at': finished,
+                'last_duration_ms': int((finished - started).total_seconds() * 1000),
+                'last_status': 'failed' if error else 'ok',
+                'last_error': error,
+                'lease_expires_at': finished + self.lease_ttl
+            }
+            if error:
+                # Later slots wait until the failed one succeeds on a retry
+                self.record(task.name, **values)
+                return
+            self.record(task.name, last_scheduled_for=slot, run_count=ScheduledJob.run_count + 1, **values)
+
+    def run_once(self):
+        now = datetime.now()
+        jobs = {job.name: job for job in ScheduledJob.query.all()}
+        missing = [name for name in self.tasks if name not in jobs]
+        if missing:
+            db.session.execute(insert_ignoring_duplicates(ScheduledJob), [{'name': name} for name in missing])
+            db.session.commit()
+        for task in self.tasks.values():
+            if not self.due_slots(task, jobs.get(task.name), now) or not self.acquire(task.name):
+                continue
+            try:
+                # Re-read under the lease: another process may have run the job since our first look
+                job = db.session.get(ScheduledJob, task.name, populate_existing=True)
+                self.run_task(task, self.due_slots(task, job, now))
+            finally:
+                self.record(task.name, lease_owner=None, lease_expires_at=None)
+        return 0
+
+scheduler = Scheduler(
+    scheduled_tasks,
+    app.config['SCHEDULER_TICK'],
+    app.config['SCHEDULER_LEASE_TTL'],
+    app.config['SCHEDULER_RETRY_DELAY'],
+    app.config['SCHEDULER_CATCH_UP_DAYS'],
+    app.config['SCHEDULER_THREAD']
+)
+background_workers.append(scheduler)
+
+@scheduled('generate-rent', '0 0 1 * *', catch_up=True)
+def _generate_rent_job(scheduled_for):
+    billing_month = scheduled_for.strftime('%Y-%m')
+    created, skipped = generate_rent_for_month(billing_month, scheduled_for.date().replace(day=6))
+    print(f"Generated {created} rent bills for {billing_month} ({skipped} already existed)")
+
+@scheduled('sweep-overdue', '5 * * * *')
+def _sweep_overdue_job(scheduled_for):
+    overdue_sweeper.sweep()
+
+def rent_reminder_query(due_date):
+    return (
+        db.select(Bill.bill_type, Bill.amount, Bill.billing_month, Tenant.email)
+        .join(Tenant, Bill.tenant_id == Tenant.id)
+        .where(Bill.status == 'pending', Bill.due_date == due_date, Tenant.email.isnot(None))
+    )
+
+# No catch-up: replaying missed days after downtime would remind tenants of due dates that have already passed
+@scheduled('rent-reminders', '0 9 * * *', catch_up=False)
+def _rent_reminder_job(scheduled_for):
+    due_date = scheduled_for.date() + timedelta(days=app.config['RENT_REMINDER_DAYS'])
+    rows = db.session.execute(rent_reminder_query(due_date)).all()
+    for bill_type, amount, billing_month, email in rows:
+        send_email(email, 'Payment Reminder - RentEase', f"Your {bill_type} bill of Rs. {amount} ({billing_month or '-'}) is due on {due_date.strftime('%d %b %Y')}.")
+
+@scheduled('prune-sync-tombstones', '50 3 * * *')
+def _prune_sync_tombstones_job(scheduled_for):
+    cutoff = datetime.utcnow() - timedelta(days=app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+    seq = db.session.scalar(db.select(db.func.max(SyncTombstone.change_seq)).where(SyncTombstone.deleted_at < cutoff))
+    if seq is not None:
+        advance_sync_horizon(db.session.connection(), seq)
+        db.session.commit()
+
+@scheduled('reconcile-payments', '30 2 * * *', catch_up=True)
+def _reconcile_payments_job(scheduled_for):
+    if payment_gateway and RAZORPAY_KEY_ID != 'rzp_test_placeholder':
+        day = scheduled_for.date() - timedelta(days=1)
+        reconcile_payments(day, day)
+
+def scheduled_job_response(task, job):
+    job = job or ScheduledJob(name=task.name, run_count=0)
+    lease_held = job.lease_expires_at is not None and job.lease_expires_at > datetime.utcnow()
+    return {
+        'name': task.name,
+        'schedule': task.schedule.expression,
+        'catch_up': task.catch_up,
+        'last_scheduled_for': job.last_scheduled_for.isoformat() if job.last_scheduled_for else None,
+        'last_started_at': job.last_started_at.isoformat() if job.last_started_at else None,
+        'last_finished_at': job.last_finished_at.isoformat() if job.last_finished_at else None,
+        'last_duration_ms': job.last_duration_ms,
+        'last_status': job.last_status,
+        'last_error': job.last_error,
+        'run_count': job.run_count,
+        'next_run_at': task.schedule.next_after(job.last_scheduled_for or datetime.now()).isoformat(),
+        'running_on': job.lease_owner if lease_held else None
+    }
+
+@app.route('/api/scheduler/jobs', methods=['GET'])
+@token_required
+@admin_required
+def get_scheduled_jobs(current_user):
+    jobs = {job.name: job for job in ScheduledJob.query.all()}
+    return jsonify([scheduled_job_response(task, jobs.get(name)) for name, task in scheduled_tasks.items()])
+
+@app.cli.command('scheduler')
+@click.option('--once', is_flag=True, help='Run whatever is due now and exit.')
+def scheduler_command(once):
+    """Run scheduled jobs until interrupted (use with SCHEDULER_THREAD=false)."""
+    if once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
+
+# ==================== JOB QUEUE ====================
+
+# kind -> fn(job, payload) returning a JSON-serializable result
+job_handlers = {}
+
+def job_handler(kind):
+    """Register the handler for a job kind. Retries and dead workers mean a job can run more than once, so handlers must be idempotent."""
+    def register(fn):
+        job_handlers[kind] = fn
+        return fn
+    return register
+
+def enqueue_job(kind, payload=None, created_by=None):
+    """Queue a job. A worker picks it up once the caller commits."""
+    if kind not in job_handlers:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = Job(kind=kind, payload=json.dumps(payload or {}), created_by=created_by)
+    db.session.add(job)
+    return job
+
+def report_progress(job, done, total=None, message=None):
+    """Record progress and renew the job's lease. Commits, so call it between units of work."""
+    job.progress_done = done
+    if total is not None:
+        job.progress_total = total
+    if message is not None:
+        job.progress_message = message[:255]
+    job.claimed_at = datetime.utcnow()
+    db.session.commit()
+
+class JobWorker(BackgroundWorker):
+    """Claims one queued job at a time and runs its handler; failures are retried with backoff."""
+    name = 'job-queue'
+    wake_tables = frozenset({'job'})
+
+    def __init__(self, max_attempts, lease, poll_interval, run_in_thread):
+        super().__init__(1, poll_interval, run_in_thread)
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease)
+        self.duration = LatencyStats()
+        self.succeeded = 0
+        self.failed = 0
+
+    def backoff(self, attempts):
+        return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600) * random.uniform(0.8, 1.2))
+
+    def run_once(self):
+        now = datetime.utcnow()
+        due = db.or_(
+            db.and_(Job.status == 'queued', Job.run_after <= now),
+            db.and_(Job.status == 'running', Job.claimed_at < now - self.lease)
+        )
+        jobs = claim_rows(Job, due, self.batch_size, status='running', claimed_at=now, started_at=now, attempts=Job.attempts + 1)
+        for job in jobs:
+            start = time.perf_counter()
+            handler = job_handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f'No handler for job kind {job.kind!r}')
+                result = handler(job, json.loads(job.payload or '{}'))
+            except Exception as e:
+                db.session.rollback()
+                job.error = str(e)
+                if handler is None or job.attempts >= self.max_attempts:
+                    job.status = 'failed'
+                    job.finished_at = datetime.utcnow()
+                    self.failed += 1
+                else:
+                    job.status = 'queued'
+                    job.run_after = datetime.utcnow() + self.backoff(job.attempts)
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+            else:
+                job.status = 'succeeded'
+                job.result = json.dumps(result)
+                job.error = None
+                job.finished_at = datetime.utcnow()
+                if job.progress_total is not None:
+                    job.progress_done = job.progress_total
+                self.succeeded += 1
+            self.duration.record(time.perf_counter() - start)
+            job.claim_token = None
+            db.session.commit()
+        return len(jobs)
+
+    def snapshot(self):
+        counts = dict(db.session.query(Job.status, db.func.count()).group_by(Job.status).all())
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'failed_total': counts.get('failed', 0),
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'duration': self.duration.snapshot()
+        }
+
+job_worker = JobWorker(
+    app.config['JOB_MAX_ATTEMPTS'],
+    app.config['JOB_LEASE'],
+    app.config['JOB_POLL_INTERVAL'],
+    app.config['JOB_WORKER_THREAD']
+)
+background_workers.append(job_worker)
+metrics_registry['job_queue'] = job_worker.snapshot
+
+@job_handler('generate-rent')
+def _generate_rent_handler(job, payload):
+    billing_month = payload['billing_month']
+    year, month = (int(p) for p in billing_month.split('-'))
+    created, skipped = generate_rent_for_month(billing_month, datetime(year, month, 6).date())
+    return {'created': created, 'skipped': skipped}
+
+@job_handler('sweep-overdue')
+def _sweep_overdue_handler(job, payload):
+    return {'swept': overdue_sweeper.sweep()}
+
+@job_handler('reconcile-payments')
+def _reconcile_payments_handler(job, payload):
+    if not payment_gateway:
+        raise RuntimeError('Payment gateway not configured')
+    date_from = datetime.fromisoformat(payload['date_from']).date()
+    date_to = datetime.fromisoformat(payload.get('date_to') or payload['date_from']).date()
+    days = (date_to - date_from).days + 1
+    run_ids = []
+    # One run per day keeps each gateway listing small and lets the frontend show progress
+    for i in range(days):
+        day = date_from + timedelta(days=i)
+        report_progress(job, i, days, f'Reconciling {day.isoformat()}')
+        run_ids.append(reconcile_payments(day, day, apply_fixes=payload.get('apply_fixes', True)).id)
+    return {'runs': run_ids}
+
+def job_response(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': {'done': job.progress_done, 'total': job.progress_total, 'message': job.progress_message},
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+@app.route('/api/jobs', methods=['POST'])
+@token_required
+@admin_required
+def create_job(current_user):
+    data = request.get_json(silent=True) or {}
+    try:
+        job = enqueue_job(data.get('kind'), data.get('payload'), current_user.id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    db.session.commit()
+    return jsonify(job_response(job)), 202
+
+@app.route('/api/jobs', methods=['GET'])
+@token_required
+@admin_required
+def get_jobs(current_user):
+    query = Job.query
+    statuses = arg_list('status')
+    if statuses:
+        query = query.filter(Job.status.in_(statuses))
+    jobs = query.order_by(Job.id.desc()).limit(min(arg_typed('limit', int) or 20, app.config['MAX_PAGE_SIZE'])).all()
+    return jsonify([job_response(j) for j in jobs])
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    """Cheap status poll: one primary key lookup."""
+    job = db.session.get(Job, job_id)
+    if not job or (current_user.role != 'admin' and job.created_by != current_user.id):
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(job_response(job))
+
+@app.cli.command('worker')
+@click.option('--concurrency', type=int, default=app.config['JOB_WORKER_CONCURRENCY'], show_default=True, help='Jobs run in parallel.')
+def worker_command(concurrency):
+    """Run queued jobs until interrupted (use with JOB_WORKER_THREAD=false)."""
+    threads = [threading.Thread(target=job_worker.run_forever, name=f'job-worker-{i}', daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+# ==================== LIVE EVENTS ====================
+
+# Changes pushed to SSE clients: kind -> (model, column naming the tenant who may see it, column sent as status).
+# A NULL tenant column means every user sees the event.
+LIVE_EVENT_SOURCES = {
+    'bill': (Bill, Bill.tenant_id, Bill.status),
+    'complaint': (Complaint, Complaint.tenant_id, Complaint.status),
+    'announcement': (Announcement, db.null(), db.null())
+}
+LIVE_EVENT_CHANNEL = 'rentease_live_events'  # Postgres NOTIFY channel
+
+def _record_live_events(conn, seq, tables):
+    now = datetime.utcnow()
+    columns = ['change_seq', 'kind', 'row_id', 'tenant_id', 'status', 'created_at']
+    recorded = 0
+    for kind, (model, tenant_column, status_column) in LIVE_EVENT_SOURCES.items():
+        if model.__tablename__ not in tables:
+            continue
+        recorded += conn.execute(db.insert(LiveEvent.__table__).from_select(columns, db.select(
+            db.literal(seq), db.literal(kind), model.id, tenant_column, status_column, db.literal(now, db.DateTime)
+        ).where(model.change_seq.is_(None)))).rowcount
+    deleted_kinds = [kind for kind, (model, _, _) in LIVE_EVENT_SOURCES.items() if model.__tablename__ in tables]
+    if deleted_kinds:
+        # Tombstones carry the owning tenant (NULL for announcements), so deletions reach whoever saw the row
+        recorded += conn.execute(db.insert(LiveEvent.__table__).from_select(columns, db.select(
+            db.literal(seq), SyncTombstone.table_name, SyncTombstone.row_id, SyncTombstone.tenant_id, db.literal('deleted'), db.literal(now, db.DateTime)
+        ).where(SyncTombstone.table_name.in_(deleted_kinds), SyncTombstone.change_seq.is_(None)))).rowcount
+    if recorded and conn.dialect.name == 'postgresql':
+        # Delivered to listeners only once the transaction commits
+        conn.execute(db.select(db.func.pg_notify(LIVE_EVENT_CHANNEL, str(seq))))
+
+sequence_listeners.append(_record_live_events)
+
+def format_live_event(event):
+    data = app.json.dumps({'id': event.row_id, 'status': event.status})
+    return f'id: {event.change_seq}-{event.id}\nevent: {event.kind}\ndata: {data}\n\n'
+
+class LiveSubscription:
+    """One SSE client: a bounded queue and an event to wake its stream. Costs no thread or DB connection while idle."""
+    def __init__(self, user_id, role, tenant_id, queue_size):
+        self.user_id = user_id
+        self.role = role
+        self.tenant_id = tenant_id
+        self.queue_size = queue_size
+        self.events = deque()
+        self.ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, event):
+        if len(self.events) >= self.queue_size:
+            self.overflowed = True
+        else:
+            self.events.append(event)
+        self.ready.set()
+
+    def take(self, timeout):
+        """Events queued so far, waiting up to timeout for the first one; [] on timeout."""
+        if not self.events:
+            self.ready.wait(timeout)
+        self.ready.clear()
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+class LiveEventBroker:
+    """Fans committed live events out to this process's subscribers, indexed by who may see them."""
+    def __init__(self, queue_size, max_streams):
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self.streams = 0
+        self.admins = set()
+        self.tenants = {}  # tenant_id -> set of subscriptions
+        self.lock = threading.Lock()
+        self.published = 0
+        self.disconnected_slow = 0
+        self.rejected = 0
+
+    def subscribe(self, identity):
+        """A new subscription, or None when this process already holds max_streams."""
+        subscription = LiveSubscription(identity.id, identity.role, identity.tenant_id, self.queue_size)
+        with self.lock:
+            if self.streams >= self.max_streams:
+                self.rejected += 1
+                return None
+            self.streams += 1
+            if identity.role == 'admin':
+                self.admins.add(subscription)
+            else:
+                self.tenants.setdefault(identity.tenant_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.streams -= 1
+            if subscription.role == 'admin':
+                self.admins.discard(subscription)
+            else:
+                subscribers = self.tenants.get(subscription.tenant_id, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self.tenants.pop(subscription.tenant_id, None)
+            if subscription.overflowed:
+                self.disconnected_slow += 1
+
+    def publish(self, events):
+        for event in events:
+            with self.lock:
+                if event.tenant_id is None:
+                    subscribers = list(self.admins) + [s for group in self.tenants.values() for s in group]
+                else:
+                    subscribers = list(self.admins) + list(self.tenants.get(event.tenant_id, ()))
+            for subscription in subscribers:
+                subscription.push(event)
+            self.published += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'subscribers': self.streams,
+                'max_streams': self.max_streams,
+                'published': self.published,
+                'disconnected_slow': self.disconnected_slow,
+                'rejected': self.rejected
+            }
+
+class LiveEventRelay(BackgroundWorker):
+    """Reads newly committed LiveEvent rows and hands them to the broker; one per process, whatever the number of clients.
+
+    Woken by this process's commits, by NOTIFY on Postgres (one LISTEN connection), and otherwise by polling.
+    """
+    name = 'live-events'
+    wake_tables = frozenset(model.__tablename__ for model, _, _ in LIVE_EVENT_SOURCES.values())
+
+    def __init__(self, broker, batch_size, poll_interval):
+        super().__init__(batch_size, poll_interval, run_in_thread=False)
+        self.broker = broker
+        self.position = None  # (change_seq, id) of the last event handed on
+
+    def start(self):
+        """Called by every new stream: the relay begins at the events committed from now on."""
+        with self._lock:
+            if self.position is None:
+                self.position = latest_live_event_position()
+        self.ensure_thread()
+
+    def run_once(self):
+        events = db.session.execute(
+            db.select(LiveEvent.id, LiveEvent.change_seq, LiveEvent.kind, LiveEvent.row_id, LiveEvent.tenant_id, LiveEvent.status)
+            .where(db.tuple_(LiveEvent.change_seq, LiveEvent.id) > db.tuple_(*self.position))
+            .order_by(LiveEvent.change_seq, LiveEvent.id)
+            .limit(self.batch_size)
+        ).all()
+        if events:
+            self.position = (events[-1].change_seq, events[-1].id)
+            self.broker.publish(events)
+        return len(events)
+
+    def run_forever(self):
+        with app.app_context():
+            postgres = db.engine.dialect.name == 'postgresql'
+        if not postgres:
+            return super().run_forever()
+        while True:
+            try:
+                self.listen()
+            except Exception as e:
+                print(f"{self.name} listener error: {e}")
+                time.sleep(self.poll_interval)
+
+    def listen(self):
+        with app.app_context():
+            raw = db.engine.raw_connection()
+        # Detached, so the LISTEN never leaks into a pooled connection
+        raw.detach()
+        conn = raw.driver_connection
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f'LISTEN {LIVE_EVENT_CHANNEL}')
+            while True:
+                with app.app_context():
+                    while self.run_once() >= self.batch_size:
+                        pass
+                # The timeout doubles as a poll in case a notification is ever missed
+                select.select([conn], [], [], self.poll_interval)
+                conn.poll()
+                conn.notifies.clear()
+        finally:
+            raw.close()
+
+def latest_live_event_position():
+    latest = db.session.execute(
+        db.select(LiveEvent.change_seq, LiveEvent.id).order_by(LiveEvent.change_seq.desc(), LiveEvent.id.desc()).limit(1)
+    ).first()
+    return tuple(latest) if latest else (0, 0)
+
+live_event_broker = LiveEventBroker(app.config['LIVE_EVENT_QUEUE_SIZE'], app.config['LIVE_EVENT_MAX_STREAMS'])
+live_event_relay = LiveEventRelay(live_event_broker, app.config['LIVE_EVENT_BATCH_SIZE'], app.config['LIVE_EVENT_POLL_INTERVAL'])
+background_workers.append(live_event_relay)
+metrics_registry['live_events'] = live_event_broker.snapshot
+
+@scheduled('prune-live-events', '40 * * * *')
+def _prune_live_events_job(scheduled_for):
+    cutoff = datetime.utcnow() - timedelta(hours=app.config['LIVE_EVENT_RETENTION_HOURS'])
+    db.session.execute(db.delete(LiveEvent).where(LiveEvent.created_at < cutoff))
+    db.session.commit()
+
+def issue_live_event_ticket(identity):
+    return jwt.encode({
+        'user_id': identity.id,
+        'role': identity.role,
+        'tenant_id': identity.tenant_id,
+        'tv': identity_cache.token_version(identity.id),
+        'purpose': 'live-events',
+        'iat': datetime.utcnow(),
+        'exp': datetime.utcnow() + timedelta(seconds=app.config['LIVE_EVENT_TICKET_TTL'])
+    }, app.config['SECRET_KEY'])
+
+@app.route('/api/events/ticket', methods=['POST'])
+@token_required
+def create_live_event_ticket(current_user):
+    """Browsers' EventSource cannot send an Authorization header, so it connects with this short-lived ticket instead."""
+    return jsonify({'ticket': issue_live_event_ticket(current_user), 'expires_in': app.config['LIVE_EVENT_TICKET_TTL']})
+
+@app.route('/api/events', methods=['GET'])
+def live_events():
+    """Server-Sent Events: bill and complaint changes for the caller's tenant (all of them for admins) and announcements.
+
+    Each event carries the row id and its new status; clients fetch details with ?since= sync. Event ids are change
+    sequence numbers, so a reconnect with Last-Event-ID replays what was missed within LIVE_EVENT_RETENTION_HOURS.
+    Idle streams only wait on an event, but each holds a worker: gunicorn.conf.py runs gevent workers so one process
+    holds thousands. Past LIVE_EVENT_MAX_STREAMS per process, new streams get 503 and EventSource retries.
+    """
+    token = request.args.get('ticket')
+    try:
+        if token:
+            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            if data.get('purpose') != 'live-events':
+                raise jwt.InvalidTokenError('Not a live events ticket')
+        else:
+            token = (request.headers.get('Authorization') or '').removeprefix('Bearer ')
+            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            if 'purpose' in data:
+                raise jwt.InvalidTokenError('Tickets must be passed as ?ticket=')
+        current_user = resolve_identity(token, data)
+    except Exception:
+        current_user = None
+    if current_user is None:
+        return jsonify({'message': 'Token is missing or invalid'}), 401
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        position = tuple(int(part) for part in last_event_id.split('-')) if last_event_id else None
+    except ValueError:
+        position = ()
+    if position is not None and len(position) != 2:
+        return jsonify({'message': 'Invalid Last-Event-ID'}), 400
+    
+    subscription = live_event_broker.subscribe(current_user)
+    if subscription is None:
+        response = jsonify({'message': 'Too many open event streams, please try again shortly'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    try:
+        live_event_relay.start()
+        # Subscribed before reading, so nothing committed from here on is missed; overlaps are skipped by position
+        if position is None:
+            position = latest_live_event_position()
+            missed = []
+        else:
+            query = db.select(LiveEvent.id, LiveEvent.change_seq, LiveEvent.kind, LiveEvent.row_id, LiveEvent.tenant_id, LiveEvent.status)
+            if current_user.role != 'admin':
+                query = query.where(db.or_(LiveEvent.tenant_id.is_(None), LiveEvent.tenant_id == current_user.tenant_id))
+            missed = db.session.execute(
+                query.where(db.tuple_(LiveEvent.change_seq, LiveEvent.id) > db.tuple_(*position))
+                .order_by(LiveEvent.change_seq, LiveEvent.id)
+            ).all()
+    except Exception:
+        live_event_broker.unsubscribe(subscription)
+        raise
+    heartbeat = app.config['LIVE_EVENT_HEARTBEAT']
+    
+    def stream(position):
+        yield f'retry: 3000\nid: {position[0]}-{position[1]}\n\n'
+        events = missed
+        while not subscription.overflowed:
+            chunk = []
+            for event in events:
+                if (event.change_seq, event.id) > position:
+                    position = (event.change_seq, event.id)
+                    chunk.append(format_live_event(event))
+            yield ''.join(chunk) if chunk else ': keep-alive\n\n'
+            events = subscription.take(heartbeat)
+        # Too slow to keep up: closing makes the browser reconnect and replay from its Last-Event-ID
+    
+    response = Response(stream(position), mimetype='text/event-stream')
+    # Runs when the server closes the response, even for a client that left before the first chunk
+    response.call_on_close(lambda: live_event_broker.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+    return response
+
+# ==================== BATCH REQUESTS ====================
+
+# Endpoints that cannot run as a batch item: batches do not nest, and event streams never end
+UNBATCHABLE_ENDPOINTS = frozenset({'batch_requests', 'live_events', 'static'})
+
+def begin_batch_transaction():
+    db.session.rollback()
+    if db.engine.dialect.name == 'postgresql':
+        # One snapshot for every item, so the results agree with each other
+        db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+
+def run_batch_item(path, current_user):
+    """Dispatch one GET inside the batch's app context, and so on its DB session. Returns (status, body)."""
+    if not path.startswith('/api/'):
+        return 400, {'message': 'path must start with /api/'}
+    with app.test_request_context(path, method='GET', base_url=request.host_url,
+                                  environ_overrides={BATCH_IDENTITY_ENVIRON: current_user}):
+        if request.routing_exception is not None:
+            e = request.routing_exception
+            return getattr(e, 'code', 404), {'message': getattr(e, 'description', 'Not found')}
+        if request.url_rule.endpoint in UNBATCHABLE_ENDPOINTS:
+            return 400, {'message': 'This endpoint cannot be batched'}
+        try:
+            rv = app.view_functions[request.url_rule.endpoint](**request.view_args)
+        except HTTPException as e:
+            return e.code, {'message': e.description}
+        except Exception as e:
+            try:
+                rv = app.handle_user_exception(e)
+            except Exception as e:
+                print(f"Batch item {path} failed: {e}")
+                begin_batch_transaction()
+                return 500, {'message': 'Internal server error'}
+        response = app.make_response(rv)
+        if not response.is_json:
+            return 400, {'message': 'Only JSON endpoints can be batched'}
+        return response.status_code, response.get_json()
+
+@app.route('/api/batch', methods=['POST'])
+@token_required
+def batch_requests(current_user):
+    """Run several GETs in one round trip: {"requests": [{"id": "bills", "path": "/api/bills?status=pending"}, ...]}.
+
+    The caller is authenticated once and every item runs on the same DB session and transaction. Items fail
+    independently; each result carries its own status code and body, in request order.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'requests must be a non-empty list'}), 400
+    if len(items) > app.config['BATCH_MAX_REQUESTS']:
+        return jsonify({'message': f"At most {app.config['BATCH_MAX_REQUESTS']} requests per batch"}), 400
+    if not all(isinstance(item, dict) and isinstance(item.get('path'), str) for item in items):
+        return jsonify({'message': 'Each request needs a path'}), 400
+    
+    begin_batch_transaction()
+    responses = []
+    for i, item in enumerate(items):
+        if str(item.get('method', 'GET')).upper() != 'GET':
+            status, body = 405, {'message': 'Only GET requests can be batched'}
+        else:
+            status, body = run_batch_item(item['path'], current_user)
+        responses.append({'id': item.get('id', i), 'status': status, 'body': body})
+    return jsonify({'responses': responses})
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
     app.run(debug=True, port=5000)
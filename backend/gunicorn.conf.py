@@ -0,0 +1,26 @@
+"""Production server settings. From backend/: flask --app app upgrade-db && gunicorn -c gunicorn.conf.py app:app
+
+Workers are gevent greenlets, so an idle /api/events stream costs a greenlet rather than a thread and one process
+holds thousands of them. Each process accepts up to LIVE_EVENT_MAX_STREAMS streams; the remaining
+worker_connections stay free for ordinary requests.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))  # processes; each runs its own background workers and event relay
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 2000))  # concurrent requests and streams per process
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))  # gevent workers heartbeat from their hub, so open streams do not trip this
+graceful_timeout = 30  # streams are cut on restart; browsers reconnect with Last-Event-ID
+keepalive = 5
+accesslog = '-'
+
+def post_fork(server, worker):
+    # The gevent worker monkey-patches sockets and threads, but psycopg2 waits in C: give it a gevent wait callback
+    # so a Postgres query yields to other greenlets instead of blocking the whole process
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning('psycogreen is not installed: Postgres queries will block every greenlet of the worker')
+        return
+    patch_psycopg()
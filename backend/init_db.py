@@ -1,13 +1,12 @@
-from app import app, db, User, Building, Room, EmergencyContact, PaymentSettings
-from werkzeug.security import generate_password_hash
+from app import app, db, User, Building, Room, EmergencyContact, PaymentSettings, hash_password, upgrade_schema
 
 with app.app_context():
     print("Creating database tables...")
-    db.create_all()
+    upgrade_schema()
     admin = User.query.filter_by(username='admin').first()
     if not admin:
         print("Creating admin user...")
-        db.session.add(User(username='admin',email='admin@rental.com',password_hash=generate_password_hash('admin123'),role='admin'))
+        db.session.add(User(username='admin',email='admin@rental.com',password_hash=hash_password('admin123'),role='admin'))
         print("Adding emergency contacts...")
         for s in [{'service_type':'Police','phone_number':'100'},{'service_type':'Fire','phone_number':'101'},{'service_type':'Ambulance','phone_number':'102'},{'service_type':'Electrician','contact_name':'Local Electrician','phone_number':'9876543210'},{'service_type':'Plumber','contact_name':'Local Plumber','phone_number':'9876543211'}]:
             db.session.add(EmergencyContact(**s))
@@ -0,0 +1,101 @@
+"""The app runs in-process on a throwaway SQLite database with its background threads off, and payment calls go to a
+local stand-in for the Razorpay API.
+
+Run from backend/:  pip install pytest && python -m pytest tests
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+for flag in ('EMAIL_WORKER_THREAD', 'WEBHOOK_WORKER_THREAD', 'SCHEDULER_THREAD', 'JOB_WORKER_THREAD', 'QUERY_CACHE_ENABLED'):
+    os.environ[flag] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, upgrade_schema, identity_cache, dashboard_cache  # noqa: E402
+
+@pytest.fixture(scope='module')
+def fresh_db():
+    """An empty, fully migrated database for one test module; every module shares the file, so it is dropped after."""
+    with app.app_context():
+        db.drop_all()
+        upgrade_schema()
+    # Ids start over in the new database, so nothing cached for the old one may match them
+    identity_cache.clear()
+    dashboard_cache.clear()
+    yield
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+class StandInGateway:
+    """Answers Razorpay API requests from queued replies, each (status, body) or (status, body, delay in seconds).
+
+    A path's last reply repeats once the others are used up; unknown paths get 404. Requests are recorded as
+    (method, path, query) in the order they arrived.
+    """
+    def __init__(self):
+        self.replies = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                gateway.handle(self)
+
+            def do_POST(self):
+                gateway.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()  # short poll: quick shutdown
+
+    def reply(self, method, path, *replies):
+        with self._lock:
+            self.replies[(method, path)] = list(replies)
+
+    def count(self, method, path):
+        return sum(1 for request in self.requests if request[:2] == (method, path))
+
+    def handle(self, request):
+        url = urlsplit(request.path)
+        if request.command == 'POST':
+            request.rfile.read(int(request.headers.get('Content-Length') or 0))
+        with self._lock:
+            self.requests.append((request.command, url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+            queued = self.replies.get((request.command, url.path))
+            reply = (queued.pop(0) if len(queued) > 1 else queued[0]) if queued else (404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Not found'}})
+        status, body, delay = reply if len(reply) == 3 else reply + (0,)
+        time.sleep(delay)
+        raw = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        try:
+            request.send_response(status)
+            request.send_header('Content-Type', 'application/json')
+            request.send_header('Content-Length', str(len(raw)))
+            request.end_headers()
+            request.wfile.write(raw)
+        except OSError:
+            pass  # the client timed out and hung up
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def gateway_stub():
+    stub = StandInGateway()
+    yield stub
+    stub.close()
@@ -0,0 +1,135 @@
+"""The email outbox must retry with backoff, give up after EMAIL_MAX_ATTEMPTS and reuse one SMTP connection."""
+import smtplib
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db, mail, send_email, EmailOutboxWorker, OutboxEmail
+
+class FakeSmtp:
+    """Stands in for flask_mail's connection: records what is sent and raises whatever fail() returns for a recipient."""
+    def __init__(self):
+        self.connects = 0
+        self.closes = 0
+        self.sent = []
+        self.fail = lambda recipient: None
+
+    def connect(self):
+        self.connects += 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closes += 1
+
+    def send(self, msg):
+        error = self.fail(msg.recipients[0])
+        if error is not None:
+            raise error
+        self.sent.append(msg.recipients[0])
+
+@pytest.fixture
+def smtp(fresh_db, monkeypatch):
+    fake = FakeSmtp()
+    monkeypatch.setattr(mail, 'connect', fake.connect)
+    with app.app_context():
+        db.session.execute(db.delete(OutboxEmail))
+        db.session.commit()
+        yield fake
+        db.session.remove()
+
+@pytest.fixture
+def worker():
+    worker = EmailOutboxWorker(batch_size=10, max_attempts=3, poll_interval=1, idle_timeout=60, run_in_thread=False)
+    yield worker
+    worker.smtp.close()
+
+def queue(*recipients):
+    for recipient in recipients:
+        send_email(recipient, 'Rent due', 'Your rent is due on the 6th.')
+    db.session.commit()
+
+def statuses():
+    return {email.recipient: email.status for email in OutboxEmail.query}
+
+def test_batch_is_sent_over_one_connection(smtp, worker):
+    queue('a@example.com', 'b@example.com', 'c@example.com')
+    assert worker.run_once() == 3
+    assert smtp.sent == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert set(statuses().values()) == {'sent'}
+    assert smtp.connects == 1
+    assert all(email.claim_token is None for email in OutboxEmail.query)
+
+def test_connection_is_reused_across_batches(smtp, worker):
+    queue('a@example.com')
+    worker.run_once()
+    queue('b@example.com')
+    worker.run_once()
+    assert smtp.sent == ['a@example.com', 'b@example.com']
+    assert smtp.connects == 1
+
+def test_idle_connection_is_reopened(smtp, worker):
+    queue('a@example.com')
+    worker.run_once()
+    worker.smtp._last_used = time.monotonic() - worker.smtp.idle_timeout - 1
+    queue('b@example.com')
+    worker.run_once()
+    assert (smtp.connects, smtp.closes) == (2, 1)
+
+def test_refused_recipient_is_retried_alone_with_backoff(smtp, worker):
+    smtp.fail = lambda recipient: smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')}) if recipient == 'b@example.com' else None
+    queue('a@example.com', 'b@example.com', 'c@example.com')
+    before = datetime.utcnow()
+    worker.run_once()
+    assert statuses() == {'a@example.com': 'sent', 'b@example.com': 'pending', 'c@example.com': 'sent'}
+    refused = OutboxEmail.query.filter_by(recipient='b@example.com').one()
+    assert refused.attempts == 1
+    assert 'No such user' in refused.last_error
+    # First retry after 30s, with 20% jitter either way
+    assert before + timedelta(seconds=24) <= refused.next_attempt_at <= datetime.utcnow() + timedelta(seconds=36)
+    assert smtp.connects == 1
+
+def test_server_failure_backs_off_the_rest_of_the_batch(smtp, worker):
+    smtp.fail = lambda recipient: smtplib.SMTPServerDisconnected('Connection unexpectedly closed') if recipient == 'b@example.com' else None
+    queue('a@example.com', 'b@example.com', 'c@example.com')
+    worker.run_once()
+    assert statuses() == {'a@example.com': 'sent', 'b@example.com': 'pending', 'c@example.com': 'pending'}
+    # One connection for the batch: the failed one is not reopened for each remaining email
+    assert (smtp.connects, smtp.closes) == (1, 1)
+    # Nothing is due until the backoff passes
+    assert worker.run_once() == 0
+    smtp.fail = lambda recipient: None
+    OutboxEmail.query.filter_by(status='pending').update({'next_attempt_at': datetime.utcnow()})
+    db.session.commit()
+    assert worker.run_once() == 2
+    assert set(statuses().values()) == {'sent'}
+    assert smtp.connects == 2
+
+def test_gives_up_after_max_attempts(smtp, worker):
+    smtp.fail = lambda recipient: smtplib.SMTPDataError(554, b'Rejected')
+    queue('a@example.com')
+    for attempt in range(worker.max_attempts):
+        OutboxEmail.query.update({'next_attempt_at': datetime.utcnow()})
+        db.session.commit()
+        assert worker.run_once() == 1
+    email = OutboxEmail.query.one()
+    assert (email.status, email.attempts) == ('failed', worker.max_attempts)
+    assert worker.failed == 1
+    OutboxEmail.query.update({'next_attempt_at': datetime.utcnow()})
+    db.session.commit()
+    assert worker.run_once() == 0
+
+def test_backoff_doubles_up_to_an_hour(worker):
+    for attempts, base in ((1, 30), (2, 60), (4, 240), (20, 3600)):
+        delay = worker.backoff(attempts).total_seconds()
+        assert base * 0.8 <= delay <= base * 1.2, attempts
+
+def test_abandoned_claim_is_taken_over(smtp, worker):
+    queue('a@example.com')
+    OutboxEmail.query.update({'status': 'sending', 'claim_token': 'dead', 'claimed_at': datetime.utcnow() - worker.LEASE - timedelta(seconds=1)})
+    db.session.commit()
+    assert worker.run_once() == 1
+    assert statuses() == {'a@example.com': 'sent'}
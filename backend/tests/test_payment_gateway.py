@@ -0,0 +1,180 @@
+"""Gateway calls must time out, retry only when idempotent and stop hitting a failing gateway (circuit breaker)."""
+import threading
+import time
+from datetime import date
+
+import pytest
+from razorpay.errors import BadRequestError
+
+from app import app, db, hash_password, CircuitBreaker, GatewayUnavailable, PaymentGateway, PaymentOrder, User, Building, Room, Tenant, Bill
+
+PAYMENT = {'id': 'pay_1', 'entity': 'payment', 'status': 'captured', 'amount': 500000}
+SERVER_ERROR = (500, {'error': {'code': 'SERVER_ERROR', 'description': 'Internal error'}})
+
+def make_gateway(stub, threshold=3, reset_timeout=30, max_retries=2, read_timeout=0.2):
+    return PaymentGateway('rzp_test_key', 'secret', stub.url, 0.5, read_timeout, max_retries, 2, CircuitBreaker(threshold, reset_timeout))
+
+def fetch(gateway):
+    return gateway.call('payment.fetch', gateway.client.payment.fetch, 'pay_1', idempotent=True)
+
+def create_order(gateway):
+    return gateway.call('order.create', gateway.client.order.create, {'amount': 500000, 'currency': 'INR'})
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Keeps the jittered retry sleeps out of the test's running time
+    monkeypatch.setattr('app.random.uniform', lambda low, high: 0)
+
+def test_read_timeout_is_unavailable_and_not_retried_for_writes(gateway_stub):
+    gateway_stub.reply('POST', '/v1/orders', (200, {'id': 'order_1'}, 1))
+    gateway = make_gateway(gateway_stub)
+    start = time.monotonic()
+    with pytest.raises(GatewayUnavailable):
+        create_order(gateway)
+    assert time.monotonic() - start < 1
+    assert gateway_stub.count('POST', '/v1/orders') == 1
+    assert gateway.breaker.failures == 1
+
+def test_idempotent_call_is_retried_through_server_errors(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', SERVER_ERROR, (200, PAYMENT, 1), (200, PAYMENT))
+    gateway = make_gateway(gateway_stub)
+    assert fetch(gateway) == PAYMENT
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 3
+    # The success closes the breaker again
+    assert (gateway.breaker.state, gateway.breaker.failures) == ('closed', 0)
+    assert gateway.snapshot()['calls']['payment.fetch']['count'] == 3
+
+def test_retries_are_bounded(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', SERVER_ERROR)
+    gateway = make_gateway(gateway_stub, threshold=10, max_retries=2)
+    with pytest.raises(GatewayUnavailable):
+        fetch(gateway)
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 3
+
+def test_connection_refused_is_unavailable(gateway_stub):
+    gateway = make_gateway(gateway_stub, max_retries=0)
+    gateway_stub.close()
+    with pytest.raises(GatewayUnavailable):
+        fetch(gateway)
+    assert gateway.breaker.failures == 1
+
+def test_bad_request_is_the_callers_fault(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', (400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The id provided does not exist'}}))
+    gateway = make_gateway(gateway_stub, threshold=1)
+    with pytest.raises(BadRequestError):
+        fetch(gateway)
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 1
+    assert gateway.breaker.state == 'closed'
+
+def test_breaker_opens_then_half_opens_then_closes(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', SERVER_ERROR)
+    gateway = make_gateway(gateway_stub, threshold=2, reset_timeout=0.3, max_retries=0)
+    for _ in range(2):
+        with pytest.raises(GatewayUnavailable):
+            fetch(gateway)
+    assert gateway.breaker.state == 'open'
+    # Open: calls fail fast without reaching the gateway
+    with pytest.raises(GatewayUnavailable):
+        fetch(gateway)
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 2
+
+    time.sleep(0.3)
+    assert gateway.breaker.state == 'half_open'
+    # A failed trial opens it for another reset_timeout
+    with pytest.raises(GatewayUnavailable):
+        fetch(gateway)
+    assert gateway.breaker.state == 'open'
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 3
+
+    time.sleep(0.3)
+    gateway_stub.reply('GET', '/v1/payments/pay_1', (200, PAYMENT))
+    assert fetch(gateway) == PAYMENT
+    assert gateway.breaker.state == 'closed'
+    assert fetch(gateway) == PAYMENT
+
+def test_half_open_lets_one_trial_through(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', (200, PAYMENT, 0.3))
+    gateway = make_gateway(gateway_stub, threshold=1, reset_timeout=0.1, read_timeout=1)
+    gateway.breaker.record_failure()
+    time.sleep(0.1)
+    trial = threading.Thread(target=fetch, args=(gateway,))
+    trial.start()
+    time.sleep(0.1)
+    # While the trial is in flight everyone else still fails fast
+    with pytest.raises(GatewayUnavailable):
+        fetch(gateway)
+    trial.join()
+    assert gateway_stub.count('GET', '/v1/payments/pay_1') == 1
+    assert gateway.breaker.state == 'closed'
+
+def test_undecodable_trial_response_ends_the_trial(gateway_stub):
+    gateway_stub.reply('GET', '/v1/payments/pay_1', (200, '<html>Bad gateway</html>'), (200, PAYMENT))
+    gateway = make_gateway(gateway_stub, threshold=1, reset_timeout=0.1)
+    gateway.breaker.record_failure()
+    time.sleep(0.1)
+    with pytest.raises(ValueError):
+        fetch(gateway)
+    assert not gateway.breaker._trial_running
+    assert gateway.breaker.state == 'open'
+    time.sleep(0.1)
+    # The next trial is allowed instead of the breaker staying stuck half-open
+    assert fetch(gateway) == PAYMENT
+    assert gateway.breaker.state == 'closed'
+
+@pytest.fixture(scope='module')
+def admin_client(fresh_db):
+    with app.app_context():
+        db.session.add(User(username='admin', email='admin@example.com', password_hash=hash_password('secret'), role='admin'))
+        db.session.add(Building(name='Block A', address='1 Main Road'))
+        db.session.commit()
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'secret'}).json['token']
+    return client, {'Authorization': f'Bearer {token}'}
+
+def make_bill(room_number):
+    with app.app_context():
+        room = Room(building_id=1, room_number=room_number, room_type='1BHK', rent_amount=5000, status='occupied')
+        db.session.add(room)
+        db.session.flush()
+        tenant = Tenant(room_id=room.id, full_name=f'Tenant {room_number}', email=f'{room_number}@example.com')
+        db.session.add(tenant)
+        db.session.flush()
+        bill = Bill(tenant_id=tenant.id, bill_type='rent', amount=5000, billing_month='2026-01', due_date=date(2026, 1, 6))
+        db.session.add(bill)
+        db.session.commit()
+        return bill.id
+
+def test_create_order_answers_503_and_can_be_retried(gateway_stub, admin_client, monkeypatch):
+    client, headers = admin_client
+    bill_id = make_bill('R1')
+    gateway = make_gateway(gateway_stub)
+    monkeypatch.setattr('app.RAZORPAY_KEY_ID', 'rzp_test_key')
+    monkeypatch.setattr('app.payment_gateway', gateway)
+    monkeypatch.setattr('app.razorpay_client', gateway.client)
+
+    gateway_stub.reply('POST', '/v1/orders', (200, {'id': 'order_late'}, 1))
+    response = client.post('/api/payment/create-order', json={'bill_id': bill_id}, headers=headers)
+    assert response.status_code == 503
+    with app.app_context():
+        assert PaymentOrder.query.filter_by(bill_id=bill_id).one().status == 'failed'
+
+    gateway_stub.reply('POST', '/v1/orders', (200, {'id': 'order_1', 'amount': 500000, 'currency': 'INR'}))
+    response = client.post('/api/payment/create-order', json={'bill_id': bill_id}, headers=headers)
+    assert response.status_code == 200, response.json
+    assert response.json['id'] == 'order_1'
+    # The same order is handed out again rather than creating a second one
+    assert client.post('/api/payment/create-order', json={'bill_id': bill_id}, headers=headers).json['id'] == 'order_1'
+    assert gateway_stub.count('POST', '/v1/orders') == 2
+
+def test_paid_order_of_an_unpaid_bill_is_started_over(admin_client):
+    # Left 'paid' by a payment that no longer settles the bill (it was reopened): create-order must not 409 forever
+    client, headers = admin_client
+    bill_id = make_bill('R2')
+    with app.app_context():
+        db.session.add(PaymentOrder(bill_id=bill_id, amount=500000, currency='INR', gateway_order_id='order_settled_nothing', status='paid'))
+        db.session.commit()
+    response = client.post('/api/payment/create-order', json={'bill_id': bill_id}, headers=headers)
+    assert response.status_code == 200, response.json
+    assert response.json['id'] != 'order_settled_nothing'
+    with app.app_context():
+        assert PaymentOrder.query.filter_by(bill_id=bill_id).one().status == 'created'
@@ -0,0 +1,141 @@
+"""Webhooks must be signed, stored once per event, applied once per payment and never mark a bill paid for less."""
+import itertools
+import json
+from datetime import date
+
+import pytest
+
+from app import app, db, webhook_signature, WebhookWorker, WebhookEvent, PaymentOrder, OutboxEmail, Tenant, Bill
+
+SECRET = 'whsec_test'
+_ids = itertools.count(1)
+
+@pytest.fixture
+def client(fresh_db, monkeypatch):
+    monkeypatch.setitem(app.config, 'RAZORPAY_WEBHOOK_SECRET', SECRET)
+    with app.app_context():
+        # Each test's worker run sees only the events that test delivered
+        db.session.execute(db.delete(WebhookEvent))
+        db.session.commit()
+        yield app.test_client()
+        db.session.remove()
+
+@pytest.fixture
+def worker():
+    return WebhookWorker(batch_size=50, poll_interval=1, run_in_thread=False)
+
+def make_bill(amount=5000, order_id=None):
+    """A pending bill (and its gateway order, if order_id is given); returns the bill id."""
+    n = next(_ids)
+    tenant = Tenant(full_name=f'Tenant {n}', email=f'tenant{n}@example.com')
+    db.session.add(tenant)
+    db.session.flush()
+    bill = Bill(tenant_id=tenant.id, bill_type='rent', amount=amount, billing_month='2026-01', due_date=date(2026, 1, 6))
+    db.session.add(bill)
+    db.session.flush()
+    if order_id:
+        db.session.add(PaymentOrder(bill_id=bill.id, amount=int(amount * 100), currency='INR', gateway_order_id=order_id, status='created'))
+    db.session.commit()
+    return bill.id
+
+def captured(payment_id, amount, order_id=None, notes=None, event='payment.captured'):
+    return {'event': event, 'payload': {'payment': {'entity': {
+        'id': payment_id, 'order_id': order_id, 'amount': amount, 'status': 'captured', 'notes': notes or {}
+    }}}}
+
+def deliver(client, payload, event_id=None, secret=SECRET):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    headers = {'X-Razorpay-Signature': webhook_signature(body, secret), 'Content-Type': 'application/json'}
+    if event_id:
+        headers['X-Razorpay-Event-Id'] = event_id
+    return client.post('/api/payment/webhook', data=body, headers=headers)
+
+def event_status(event_id):
+    event = WebhookEvent.query.filter_by(event_id=event_id).one()
+    return event.status, event.error
+
+def test_unsigned_or_missigned_webhook_is_rejected(client):
+    body = json.dumps(captured('pay_x', 500000)).encode()
+    assert client.post('/api/payment/webhook', data=body).status_code == 400
+    assert deliver(client, body, secret='someone-else').status_code == 400
+    assert WebhookEvent.query.count() == 0
+
+def test_missing_secret_is_unavailable(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'RAZORPAY_WEBHOOK_SECRET', None)
+    assert deliver(client, captured('pay_x', 500000)).status_code == 503
+
+@pytest.mark.parametrize('body', [b'[]', b'"x"', b'1', b'{bad', b''])
+def test_signed_body_that_is_not_an_event_object_is_rejected(client, body):
+    response = deliver(client, body)
+    assert response.status_code == 400
+    assert response.json['message'] == 'Invalid payload'
+
+def test_redelivered_event_is_stored_once(client):
+    payload = captured('pay_redeliver', 500000)
+    assert deliver(client, payload, 'evt_redeliver').status_code == 200
+    assert deliver(client, payload, 'evt_redeliver').status_code == 200
+    assert WebhookEvent.query.filter_by(event_id='evt_redeliver').count() == 1
+
+def test_captured_payment_marks_its_bill_paid(client, worker):
+    bill_id = make_bill(order_id='order_paid')
+    deliver(client, captured('pay_paid', 500000, 'order_paid'), 'evt_paid')
+    assert worker.run_once() == 1
+    bill = db.session.get(Bill, bill_id)
+    assert (bill.status, bill.razorpay_payment_id) == ('paid', 'pay_paid')
+    assert PaymentOrder.query.filter_by(gateway_order_id='order_paid').one().status == 'paid'
+    assert event_status('evt_paid') == ('processed', None)
+    assert OutboxEmail.query.filter_by(recipient=bill.tenant.email).count() == 1
+
+def test_payment_is_applied_once_across_events(client, worker):
+    bill_id = make_bill(order_id='order_twice')
+    # payment.captured and order.paid carry the same payment, in one batch and again in a later one
+    deliver(client, captured('pay_twice', 500000, 'order_twice'), 'evt_twice_1')
+    deliver(client, captured('pay_twice', 500000, 'order_twice', event='order.paid'), 'evt_twice_2')
+    worker.run_once()
+    deliver(client, captured('pay_twice', 500000, 'order_twice'), 'evt_twice_3')
+    worker.run_once()
+    assert event_status('evt_twice_1') == ('processed', None)
+    assert event_status('evt_twice_2') == ('ignored', 'duplicate payment')
+    assert event_status('evt_twice_3') == ('ignored', 'duplicate payment')
+    assert worker.applied == 1
+    assert OutboxEmail.query.filter_by(recipient=db.session.get(Bill, bill_id).tenant.email).count() == 1
+
+def test_short_payment_does_not_pay_the_bill(client, worker):
+    bill_id = make_bill(amount=5000, order_id='order_short')
+    deliver(client, captured('pay_short', 100, 'order_short'), 'evt_short')
+    worker.run_once()
+    status, error = event_status('evt_short')
+    assert status == 'failed'
+    assert error == 'captured 100 but bill is for 500000'
+    assert db.session.get(Bill, bill_id).status == 'pending'
+
+def test_payment_without_order_is_held_against_the_bill_in_its_notes(client, worker):
+    short_id = make_bill(amount=5000)
+    paid_id = make_bill(amount=5000)
+    deliver(client, captured('pay_notes_short', 499999, notes={'bill_id': str(short_id)}), 'evt_notes_short')
+    deliver(client, captured('pay_notes', 500000, notes={'bill_id': str(paid_id)}), 'evt_notes')
+    worker.run_once()
+    assert event_status('evt_notes_short')[0] == 'failed'
+    assert db.session.get(Bill, short_id).status == 'pending'
+    assert event_status('evt_notes')[0] == 'processed'
+    assert db.session.get(Bill, paid_id).status == 'paid'
+
+def test_payment_for_no_bill_fails(client, worker):
+    deliver(client, captured('pay_orphan', 500000, 'order_unknown'), 'evt_orphan')
+    worker.run_once()
+    assert event_status('evt_orphan') == ('failed', 'no bill for order order_unknown')
+
+def test_other_events_are_ignored(client, worker):
+    deliver(client, {'event': 'refund.created', 'payload': {}}, 'evt_refund')
+    worker.run_once()
+    assert event_status('evt_refund')[0] == 'ignored'
+
+def test_malformed_event_fails_alone(client, worker):
+    bill_id = make_bill(order_id='order_batch')
+    deliver(client, {'event': 'payment.captured', 'payload': []}, 'evt_malformed')
+    deliver(client, captured('pay_batch', 500000, 'order_batch'), 'evt_batch')
+    assert worker.run_once() == 2
+    status, error = event_status('evt_malformed')
+    assert status == 'failed' and error.startswith('unreadable payload')
+    assert event_status('evt_batch')[0] == 'processed'
+    assert db.session.get(Bill, bill_id).status == 'paid'
@@ -0,0 +1,60 @@
+"""The list endpoints must run the same number of queries whatever the number of rows (no N+1 loads)."""
+from datetime import date
+
+import pytest
+
+from app import app, db, hash_password, User, Building, Room, Tenant, Bill, Complaint
+
+LISTINGS = ['/api/rooms', '/api/tenants', '/api/bills', '/api/complaints', '/api/buildings/1/rooms']
+
+@pytest.fixture(scope='module')
+def client(fresh_db):
+    with app.app_context():
+        db.session.add(User(username='admin', email='admin@example.com', password_hash=hash_password('secret'), role='admin'))
+        db.session.add(Building(name='Block A', address='1 Main Road'))
+        db.session.commit()
+    return app.test_client()
+
+@pytest.fixture(scope='module')
+def headers(client):
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'secret'}).json['token']
+    return {'Authorization': f'Bearer {token}'}
+
+def add_rows(start, count):
+    """One room, tenant, bill and complaint per i, so every listing grows by `count` rows."""
+    with app.app_context():
+        for i in range(start, start + count):
+            room = Room(building_id=1, room_number=f'R{i}', room_type='1BHK', rent_amount=10000 + i, status='occupied')
+            db.session.add(room)
+            db.session.flush()
+            tenant = Tenant(room_id=room.id, full_name=f'Tenant {i}', email=f'tenant{i}@example.com')
+            db.session.add(tenant)
+            db.session.flush()
+            db.session.add(Bill(tenant_id=tenant.id, bill_type='rent', amount=room.rent_amount, billing_month='2026-01', due_date=date(2026, 1, 6)))
+            db.session.add(Complaint(tenant_id=tenant.id, subject=f'Leak {i}', description='Kitchen tap'))
+        db.session.commit()
+
+def count_queries(client, headers, path):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    client.get(path, headers=headers)  # warm the per-process auth caches
+    db.event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        db.event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.data
+    return len(statements), len(response.json)
+
+def test_listing_query_count_is_constant(client, headers):
+    add_rows(0, 1)
+    small = {path: count_queries(client, headers, path) for path in LISTINGS}
+    add_rows(1, 49)
+    large = {path: count_queries(client, headers, path) for path in LISTINGS}
+    for path in LISTINGS:
+        (small_queries, small_rows), (large_queries, large_rows) = small[path], large[path]
+        assert (small_rows, large_rows) == (1, 50), path
+        assert small_queries == large_queries, f'{path}: {small_queries} queries for 1 row, {large_queries} for 50'
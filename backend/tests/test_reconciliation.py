@@ -0,0 +1,146 @@
+"""Reconciliation must page through every gateway payment, fix only captured-but-unrecorded bills and report the rest."""
+import itertools
+import json
+from datetime import date, datetime, time, timezone
+
+import pytest
+
+from app import app, db, reconcile_payments, CircuitBreaker, PaymentGateway, PaymentOrder, ReconciliationRun, Tenant, Bill
+
+DAY = date(2026, 3, 10)
+NOON = int(datetime.combine(DAY, time(12), tzinfo=timezone.utc).timestamp())
+_ids = itertools.count(1)
+
+@pytest.fixture
+def gateway(fresh_db, gateway_stub, monkeypatch):
+    gateway = PaymentGateway('rzp_test_key', 'secret', gateway_stub.url, 0.5, 1, 0, 2, CircuitBreaker(5, 30))
+    monkeypatch.setattr('app.payment_gateway', gateway)
+    monkeypatch.setattr('app.razorpay_client', gateway.client)
+    monkeypatch.setitem(app.config, 'RECONCILE_PAGE_SIZE', 2)
+    with app.app_context():
+        for model in (ReconciliationRun, PaymentOrder, Bill):
+            db.session.execute(db.delete(model))
+        db.session.commit()
+        yield gateway_stub
+        db.session.remove()
+
+def make_bill(amount=5000, order_id=None, **values):
+    n = next(_ids)
+    tenant = Tenant(full_name=f'Tenant {n}', email=f'tenant{n}@example.com')
+    db.session.add(tenant)
+    db.session.flush()
+    bill = Bill(tenant_id=tenant.id, bill_type='rent', amount=amount, billing_month='2026-03', due_date=date(2026, 3, 6), **values)
+    db.session.add(bill)
+    db.session.flush()
+    if order_id:
+        db.session.add(PaymentOrder(bill_id=bill.id, amount=int(amount * 100), currency='INR', gateway_order_id=order_id, status='created'))
+    db.session.commit()
+    return bill
+
+def payment(payment_id, amount=500000, order_id=None, bill_id=None, status='captured'):
+    return {
+        'id': payment_id, 'entity': 'payment', 'amount': amount, 'status': status, 'order_id': order_id,
+        'notes': {'bill_id': str(bill_id)} if bill_id else [], 'created_at': NOON - 60, 'captured_at': NOON
+    }
+
+def listing(stub, *payments, page_size=2):
+    pages = [list(payments[i:i + page_size]) for i in range(0, len(payments), page_size)]
+    if len(payments) % page_size == 0:
+        pages.append([])
+    stub.reply('GET', '/v1/payments', *[(200, {'entity': 'collection', 'count': len(page), 'items': page}) for page in pages])
+
+def report_types(run):
+    return sorted(entry['type'] for entry in json.loads(run.report))
+
+def test_captured_payment_missing_from_our_books_is_fixed(gateway):
+    bill = make_bill(order_id='order_1')
+    listing(gateway, payment('pay_1', order_id='order_1'))
+    run = reconcile_payments(DAY, DAY)
+    assert (run.payments_scanned, run.discrepancies, run.fixes_applied) == (1, 1, 1)
+    assert json.loads(run.report) == [{'type': 'captured_not_recorded', 'payment_id': 'pay_1', 'bill_id': bill.id, 'fixed': True}]
+    db.session.refresh(bill)
+    assert (bill.status, bill.razorpay_payment_id, bill.paid_date, bill.payment_screenshot) == ('paid', 'pay_1', DAY, 'razorpay_auto_verified')
+    assert PaymentOrder.query.filter_by(gateway_order_id='order_1').one().status == 'paid'
+
+def test_dry_run_reports_without_fixing(gateway):
+    bill = make_bill(order_id='order_dry')
+    listing(gateway, payment('pay_dry', order_id='order_dry'))
+    run = reconcile_payments(DAY, DAY, apply_fixes=False)
+    assert json.loads(run.report)[0]['fixed'] is False
+    assert run.fixes_applied == 0
+    db.session.refresh(bill)
+    assert bill.status == 'pending'
+
+def test_payment_without_order_is_matched_through_its_notes(gateway):
+    bill = make_bill()
+    listing(gateway, payment('pay_notes', bill_id=bill.id))
+    run = reconcile_payments(DAY, DAY)
+    assert run.fixes_applied == 1
+    db.session.refresh(bill)
+    assert (bill.status, bill.razorpay_payment_id) == ('paid', 'pay_notes')
+
+def test_every_page_is_read(gateway):
+    bills = [make_bill(order_id=f'order_page_{i}') for i in range(5)]
+    listing(gateway, *[payment(f'pay_page_{i}', order_id=f'order_page_{i}') for i in range(5)])
+    run = reconcile_payments(DAY, DAY)
+    assert (run.payments_scanned, run.fixes_applied) == (5, 5)
+    pages = [query for method, path, query in gateway.requests if path == '/v1/payments']
+    assert [page['skip'] for page in pages] == ['0', '2', '4']
+    start = int(datetime.combine(DAY, time()).timestamp())
+    assert all((page['from'], page['to'], page['count']) == (str(start), str(start + 86399), '2') for page in pages)
+    for bill in bills:
+        db.session.refresh(bill)
+        assert bill.status == 'paid'
+
+def test_mismatches_are_reported_not_fixed(gateway):
+    short = make_bill(order_id='order_short')
+    recorded = make_bill(order_id='order_recorded', status='paid', razorpay_payment_id='pay_elsewhere')
+    other = make_bill(order_id='order_other')
+    listing(
+        gateway,
+        payment('pay_short', amount=100, order_id='order_short'),
+        payment('pay_unmatched'),
+        # The gateway says this payment was for other's order, but we recorded it on another bill
+        payment('pay_elsewhere', order_id='order_other'),
+        payment('pay_failed', order_id='order_recorded', status='failed')
+    )
+    run = reconcile_payments(DAY, DAY)
+    assert report_types(run) == ['amount_mismatch', 'payment_on_wrong_bill', 'unmatched_payment']
+    assert (run.payments_scanned, run.fixes_applied) == (4, 0)
+    for bill, status in ((short, 'pending'), (recorded, 'paid'), (other, 'pending')):
+        db.session.refresh(bill)
+        assert bill.status == status
+
+def test_two_captures_for_one_bill_fix_it_once(gateway):
+    bill = make_bill(order_id='order_double')
+    listing(gateway, payment('pay_double_1', order_id='order_double'), payment('pay_double_2', bill_id=bill.id))
+    run = reconcile_payments(DAY, DAY)
+    assert run.fixes_applied == 1
+    assert report_types(run) == ['captured_not_recorded']
+    db.session.refresh(bill)
+    assert bill.razorpay_payment_id == 'pay_double_1'
+
+def test_paid_bill_without_a_captured_payment_is_reported(gateway):
+    refunded = make_bill(status='paid', paid_date=DAY, payment_screenshot='razorpay_auto_verified', razorpay_payment_id='pay_refunded')
+    missing = make_bill(status='paid', paid_date=DAY, payment_screenshot='razorpay_auto_verified', razorpay_payment_id='pay_missing')
+    make_bill(status='paid', paid_date=DAY, payment_screenshot='razorpay_auto_verified', razorpay_payment_id='pay_outside')
+    make_bill(status='paid', paid_date=DAY, payment_screenshot='razorpay_auto_verified', razorpay_payment_id='pay_mock_1')
+    listing(gateway)
+    # Not in the day's listing, so each is fetched directly
+    gateway.reply('GET', '/v1/payments/pay_refunded', (200, payment('pay_refunded', status='refunded')))
+    gateway.reply('GET', '/v1/payments/pay_outside', (200, payment('pay_outside')))
+    run = reconcile_payments(DAY, DAY)
+    report = sorted(json.loads(run.report), key=lambda entry: entry['bill_id'])
+    assert report == [
+        {'type': 'paid_without_capture', 'bill_id': refunded.id, 'payment_id': 'pay_refunded', 'gateway_status': 'refunded'},
+        {'type': 'paid_without_capture', 'bill_id': missing.id, 'payment_id': 'pay_missing', 'gateway_status': None}
+    ]
+    # Mock payments never reached the gateway and are not looked up
+    assert gateway.count('GET', '/v1/payments/pay_mock_1') == 0
+
+def test_recorded_payment_is_not_a_discrepancy(gateway):
+    make_bill(order_id='order_ok', status='paid', paid_date=DAY, payment_screenshot='razorpay_auto_verified', razorpay_payment_id='pay_ok')
+    listing(gateway, payment('pay_ok', order_id='order_ok'))
+    run = reconcile_payments(DAY, DAY)
+    assert (run.payments_scanned, run.discrepancies, run.fixes_applied) == (1, 0, 0)
+    assert ReconciliationRun.query.count() == 1
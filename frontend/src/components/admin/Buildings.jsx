@@ -46,7 +46,7 @@ export default function Buildings({ showToast }) {
                     <td><span className="badge badge-primary">{b.building_type}</span></td>
                     <td>{b.total_floors||'-'}</td>
                     <td>{b.room_count}</td>
-                    <td>{b.occupied}/{b.room_count}</td>
+                    <td>{b.occupied_count}/{b.room_count} <span className="text-muted" style={{fontSize:12}}>({b.occupancy_pct}%)</span></td>
                     <td>
                       <button className="btn btn-ghost btn-sm" onClick={() => edit(b)}>✏️ Edit</button>
                       <button className="btn btn-danger btn-sm" style={{marginLeft:6}} onClick={() => del(b.id)}>🗑 Del</button>
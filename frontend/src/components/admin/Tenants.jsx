@@ -17,7 +17,7 @@ export default function Tenants({ showToast }) {
 
   const load = () => {
     API.get('/tenants').then(r => setTenants(r.data))
-    API.get('/rooms').then(r => setRooms(r.data.filter(r => r.status === 'vacant')))
+    API.get('/rooms', { params: { status: 'vacant' } }).then(r => setRooms(r.data))
   }
   useEffect(() => { load() }, [])
 
@@ -32,7 +32,7 @@ export default function TenantBills({ showToast }) {
 
   const handleRazorpay = async () => {
     try {
-      const order = await API.post('/payment/create-order', { amount: payModal.amount })
+      const order = await API.post('/payment/create-order', { bill_id: payModal.id })
 
       // Handle mock payment for testing
       if (order.data.mock) {
@@ -95,7 +95,7 @@ export default function TenantBills({ showToast }) {
     catch (ex) { showToast('Error loading receipt', 'error') }
   }
 
-  const pending = bills.filter(b => b.status === 'pending')
+  const pending = bills.filter(b => b.status === 'pending' || b.status === 'overdue')
   const paid = bills.filter(b => b.status === 'paid')
   const total = pending.reduce((s, b) => s + b.amount, 0)
 
@@ -118,7 +118,7 @@ export default function TenantBills({ showToast }) {
               <tbody>
                 {pending.map(b => (
                   <tr key={b.id}>
-                    <td data-label="Type"><span className="badge badge-warning">{b.bill_type}</span></td>
+                    <td data-label="Type"><span className={`badge badge-${b.status === 'overdue' ? 'danger' : 'warning'}`}>{b.bill_type}</span></td>
                     <td data-label="Amount"><b style={{ fontSize: 16 }}>₹{b.amount?.toLocaleString()}</b></td>
                     <td data-label="Month">{b.billing_month || '-'}</td>
                     <td data-label="Due Date">{b.due_date}</td>